@@ -1,12 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import sys
-import time
 import pygame
 
-from anim10 import new_animation, new_grid
-from helpers import get_delta_time, process_events
-from pygameframe import PyGameFrame
+from anim10 import AnimationGroup, new_animation, new_grid
+from helpers import Clock, process_events
+from pygameframe import DirtyRects, PyGameSubsurfaceFrame
 
 SCREEN_SIZE = (800, 600)
 
@@ -18,7 +17,10 @@ def main(argv):
 
     image = pygame.image.load('media/1945.png')
 
-    g32 = new_grid(PyGameFrame, 32, 32, 1024, 768, 3, 3, 1)
+    g32 = new_grid(PyGameSubsurfaceFrame, 32, 32, 1024, 768, 3, 3, 1)
+
+    # All the animations follow one timer, so one update advances them.
+    group = AnimationGroup()
 
     spinning = [
         new_animation(g32('1-8', 1), 0.1),
@@ -32,12 +34,12 @@ def main(argv):
         new_animation(g32('1-8', 5), 0.9),
     ]
 
-    g64 = new_grid(PyGameFrame, 64, 64, 1024, 769, 299, 101, 2)
+    g64 = new_grid(PyGameSubsurfaceFrame, 64, 64, 1024, 769, 299, 101, 2)
 
     plane = new_animation(g64(1, '1-3'), 0.1)
     seaplane = new_animation(g64('2-4', 3), 0.1)
 
-    gs = new_grid(PyGameFrame, 32, 98, 1024, 768, 366, 102, 1)
+    gs = new_grid(PyGameSubsurfaceFrame, 32, 98, 1024, 768, 366, 102, 1)
     submarine = new_animation(gs('7-1', 1, '2-7', 1), {
         1: 1,
         '2-7': 0.1,
@@ -45,28 +47,30 @@ def main(argv):
         '9-13': 0.1,
     })
 
+    spinning = [group.add(i, spin) for i, spin in enumerate(spinning)]
+    plane = group.add('plane', plane)
+    seaplane = group.add('seaplane', seaplane)
+    submarine = group.add('submarine', submarine)
+
+    clock = Clock(fps=60)
+    dirty = DirtyRects((0, 0, 0, 255))
+
     terminated = False
     while not terminated:
         terminated = process_events()
-        dt = get_delta_time()
+        dt = clock.tick()
 
-        for spin in spinning:
-            spin.update(dt)
-        plane.update(dt)
-        seaplane.update(dt)
-        submarine.update(dt)
+        group.update(dt)
 
-        screen.fill((0, 0, 0, 255))
         for i, spin in enumerate(spinning):
-            spin.draw(screen, image, i * 75, i * 50)
+            dirty.add(spin, image, i * 75, i * 50)
 
-        plane.draw(screen, image, 100, 400)
-        seaplane.draw(screen, image, 250, 432)
+        dirty.add(plane, image, 100, 400)
+        dirty.add(seaplane, image, 250, 432)
 
-        submarine.draw(screen, image, 600, 100)
+        dirty.add(submarine, image, 600, 100)
 
-        pygame.display.update()
-        time.sleep(0.001)
+        pygame.display.update(dirty.draw(screen))
 
 if __name__ == '__main__':
     sys.exit(main(sys.argv))
@@ -2,9 +2,18 @@
 """An animation library for python.
 
 """
+from bisect import bisect_left, bisect_right
 from enum import Enum
+import heapq
+import itertools
 import math
 import re
+from types import MappingProxyType
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 __version__ = '2.3.0'
 __author__ = 'Eremin Dmitry (mail@eremindmitry.ru)'
@@ -12,6 +21,10 @@ __author__ = 'Eremin Dmitry (mail@eremindmitry.ru)'
 
 _NUMBER_TYPES = (int, float)
 
+_SPACES_RE = re.compile(r'\s+')
+_INTERVAL_RE = re.compile(r'^(\d+)-(\d+)$')
+_parsed_intervals = {}
+
 
 class Status:
     """Describes animation status.
@@ -25,6 +38,46 @@ class Status:
     paused = 1
 
 
+class Playback:
+    """Describes animation playback mode.
+
+    Attributes:
+        loop (int): Play the frames from the first to the last again
+            and again.
+        once (int): Play the frames once and pause at the last frame.
+        ping_pong (int): Play the frames forward and then backward,
+            the first and the last frames are not repeated.
+        reverse (int): Play the frames from the last to the first again
+            and again.
+
+    The reverse playback shows the same frames as the reversed frames list
+    and the ping-pong playback as the mirrored one, with the same loops:
+
+    >>> def play(animation, mode=Playback.loop, dt=0.25, steps=20):
+    ...     loops = []
+    ...     animation.mode, animation.on_loop = mode, loops.append
+    ...     frames = ''
+    ...     for _ in range(steps):
+    ...         animation.update(dt)
+    ...         frames += animation.get_frame_info()
+    ...     return frames, loops
+    >>> durations = [0.25, 0.5, 0.25, 0.5]
+    >>> play(Animation('abcd', durations), Playback.reverse)
+    ('aadccaaadccaaadccaaa', [1, 1, 1])
+    >>> play(Animation('dcba', durations[::-1]))
+    ('aadccaaadccaaadccaaa', [1, 1, 1])
+    >>> play(Animation('abcd', durations), Playback.ping_pong, dt=0.75)
+    ('acbacbacbacbacbacbac', [1, 1, 1, 1, 1, 1])
+    >>> play(Animation('abcdcb', durations + durations[2:0:-1]), dt=0.75)
+    ('acbacbacbacbacbacbac', [1, 1, 1, 1, 1, 1])
+
+    """
+    loop = 0
+    once = 1
+    ping_pong = 2
+    reverse = 3
+
+
 class Frame:
     """Describes the image frame.
 
@@ -39,7 +92,20 @@ class Frame:
 
         quad: Keeps a low-level frame object. Required for drawing.
 
+        offset_x (int): The left offset of the trimmed frame inside
+            the original frame. Defaults to 0.
+        offset_y (int): The top offset of the trimmed frame inside
+            the original frame. Defaults to 0.
+        full_width (int): The width of the original frame before trimming.
+        full_height (int): The height of the original frame before trimming.
+
+        transformable (bool): Whether the draw method accepts the flip_h
+            and flip_v keyword arguments. Animation passes its flip flags
+            only to such frames. Defaults to False.
+
     """
+    transformable = False
+
     def __init__(self, x, y, width, height, sw, sh):
         """Initialize frame object.
 
@@ -61,6 +127,11 @@ class Frame:
         self.image_width = sw
         self.image_height = sh
 
+        self.offset_x = 0
+        self.offset_y = 0
+        self.full_width = width
+        self.full_height = height
+
         self.quad = self.create_frame(self.width, self.height)
 
     def get_viewport(self):
@@ -72,6 +143,62 @@ class Frame:
         """
         return self.x, self.y, self.width, self.height
 
+    def get_blit(self, image, **kwargs):
+        """Describe how to blit the frame. RenderBatch uses it to collect
+        the draws. Overload it if the frame draws differently.
+
+        Args:
+            image: The image where all the frames are.
+            kwargs: The same keyword arguments which the draw method accepts.
+
+        Returns:
+            A tuple of the source image, the source area
+            (None means the whole source) and the x and y offsets
+            of the destination.
+
+        """
+        return (image, self.get_viewport()) + self.get_offset()
+
+    def get_offset(self, flip_h=False, flip_v=False):
+        """Return where the trimmed frame is drawn relative to
+        the original frame position.
+
+        Args:
+            flip_h (bool, optional): The frame is flipped horizontally.
+            flip_v (bool, optional): The frame is flipped vertically.
+
+        Returns:
+            tuple: The x and y offsets.
+
+        """
+        x, y = self.offset_x, self.offset_y
+        if flip_h:
+            x = self.full_width - x - self.width
+        if flip_v:
+            y = self.full_height - y - self.height
+        return x, y
+
+    def trim(self, left, top, width, height):
+        """Shrink the frame to its region. The frame is drawn at the same
+        position, but only the region pixels are drawn.
+
+        Args:
+            left (int): The left coordinate of the region in the frame.
+            top (int): The top coordinate of the region in the frame.
+            width (int): The region width.
+            height (int): The region height.
+
+        """
+        self.x += left
+        self.y += top
+        self.width = width
+        self.height = height
+
+        self.offset_x += left
+        self.offset_y += top
+
+        self.quad = self.create_frame(self.width, self.height)
+
     def create_frame(self):
         """Abstract method. This method must be overloaded.
 
@@ -127,7 +254,11 @@ class Grid:
         width (int): The number of cells in the image by x-axis.
         height (int): The number of cells in the image by y-axis.
 
-        frames (dict): The grid frames dictionary. For example:
+        cells (list): The dense row-major list of the grid frames.
+            The frame in the column x and the row y (starting from 0) is
+            self.cells[y * self.width + x]. Not created frames are None.
+        frames (dict): The grid frames dictionary built from the cells.
+            For example:
             Left-top frame of the image (1, 1): self.frames[0][0]
             The frame with the coordinates[3, 8]: self.frames[2][7]
 
@@ -170,7 +301,17 @@ class Grid:
         self.width = math.floor(self.image_width / self.frame_width)
         self.height = math.floor(self.image_height / self.frame_height)
 
-        self.frames = {}
+        self.cells = [None] * (self.width * self.height)
+        self._specs = {}
+
+    @property
+    def frames(self):
+        result = {}
+        for index, frame in enumerate(self.cells):
+            if frame is not None:
+                y, x = divmod(index, self.width)
+                result.setdefault(x, {})[y] = frame
+        return result
 
     def get_frames(self, *args):
         """Accepts an arbitrary number of parameters. They can be either
@@ -196,42 +337,85 @@ class Grid:
                 # return the frames in {1, 3}, {2, 3}, {3, 3}, {2, 3}.
 
         """
-        result = []
-
-        for i in range(0, len(args), 2):
-            min_x, max_x, step_x = _parse_interval(args[i])
-            min_y, max_y, step_y = _parse_interval(args[i + 1])
-            for y in range(min_y, max_y, step_y):
-                for x in range(min_x, max_x, step_x):
-                    result.append(self._get_or_create_frame(x, y))
-
-        return result
+        return self.get_cells(self.compile_spec(*args))
 
     def __call__(self, *args, **kwargs):
         """An alias for the get_frames function."""
         return self.get_frames(*args, **kwargs)
 
-    def _get_or_create_frame(self, x, y):
-        """Return the frame in the given coordinates or create the new frame,
-        if it is not exists. The coordinates starts from (0, 0)
+    def compile_spec(self, *args):
+        """Convert the get_frames arguments to the cell indices.
+        The result is memoized, so each spec is parsed only once.
+
+        Returns:
+            A tuple of the indices in the cells list.
+
+        """
+        indices = self._specs.get(args)
+        if indices is None:
+            indices = self._specs[args] = self._compile_spec(args)
+        return indices
+
+    def get_cells(self, indices):
+        """Return the frames by the cell indices, creating the missing ones.
+
+        Args:
+            indices (list): The indices in the cells list.
+
+        Returns:
+            The list with the frames.
+
+        """
+        cells = self.cells
+        result = []
+        for index in indices:
+            frame = cells[index]
+            if frame is None:
+                y, x = divmod(index, self.width)
+                frame = cells[index] = self._create_frame(x, y)
+            result.append(frame)
+
+        return result
+
+    def prebuild(self):
+        """Create all the grid frames at once.
+
+        Returns:
+            The grid, so you can do things like:
+                grid = Grid(PyGameFrame, 32, 32, 384, 256).prebuild()
+
+        """
+        cells = self.cells
+        for y in range(self.height):
+            for x in range(self.width):
+                index = y * self.width + x
+                if cells[index] is None:
+                    cells[index] = self._create_frame(x, y)
+        return self
+
+    def _compile_spec(self, args):
+        """Convert the get_frames arguments to the cell indices.
 
         Args:
-            x (int): The x-coordinate of the required frame.
-            y (int): The y-coordinate of the required frame.
+            args (tuple): The get_frames arguments.
 
         Returns:
-            The frame object.
+            A tuple of the cell indices.
 
         """
-        assert type(x) == int and x >= 0 and x < self.width
-        assert type(y) == int and y >= 0 and y < self.height
+        result = []
 
-        if x not in self.frames:
-            self.frames[x] = {}
-        if y not in self.frames[x]:
-            self.frames[x][y] = self._create_frame(x, y)
+        for i in range(0, len(args), 2):
+            min_x, max_x, step_x = _parse_interval(args[i])
+            min_y, max_y, step_y = _parse_interval(args[i + 1])
+            for y in range(min_y, max_y, step_y):
+                for x in range(min_x, max_x, step_x):
+                    assert 0 <= x < self.width and 0 <= y < self.height, \
+                        'The frame ({0}, {1}) is out of the grid'.format(
+                            x + 1, y + 1)
+                    result.append(y * self.width + x)
 
-        return self.frames[x][y]
+        return tuple(result)
 
     def _create_frame(self, x, y):
         """Create the new frame at the given coordinates.
@@ -250,25 +434,394 @@ class Grid:
                               self.image_width, self.image_height)
 
 
+class SkylinePacker:
+    """Packs rectangles into a page with the skyline bottom-left algorithm.
+
+    Attributes:
+        width (int): The page width.
+        height (int): The page height.
+        used_width (int): The right edge of the packed rectangles.
+        used_height (int): The bottom edge of the packed rectangles.
+
+    """
+    def __init__(self, width, height):
+        """Initialize the packer object.
+
+        Args:
+            width (int): The page width.
+            height (int): The page height.
+
+        """
+        self.width = width
+        self.height = height
+
+        self.used_width = 0
+        self.used_height = 0
+
+        self._skyline = [[0, 0, width]]
+
+    def insert(self, width, height):
+        """Find the place for the rectangle and occupy it.
+
+        Args:
+            width (int): The rectangle width.
+            height (int): The rectangle height.
+
+        Returns:
+            The (x, y) tuple of the rectangle position or None,
+            if the rectangle does not fit.
+
+        >>> packer = SkylinePacker(4, 4)
+        >>> [packer.insert(2, 2) for _ in range(5)]
+        [(0, 0), (2, 0), (0, 2), (2, 2), None]
+
+        """
+        best, best_index = None, None
+        for i, (x, _, segment_width) in enumerate(self._skyline):
+            y = self._fit(i, width, height)
+            if y is not None and (best is None or
+                                  (y + height, segment_width) < best[2:]):
+                best, best_index = (x, y, y + height, segment_width), i
+
+        if best is None:
+            return None
+
+        x, y = best[:2]
+        self._occupy(best_index, x, y + height, width)
+        self.used_width = max(self.used_width, x + width)
+        self.used_height = max(self.used_height, y + height)
+        return x, y
+
+    def _fit(self, index, width, height):
+        """Return the lowest y where the rectangle fits starting
+        from the given skyline segment or None."""
+        x = self._skyline[index][0]
+        if x + width > self.width:
+            return None
+
+        y, remaining = 0, width
+        for _, segment_y, segment_width in self._skyline[index:]:
+            y = max(y, segment_y)
+            if y + height > self.height:
+                return None
+            remaining -= segment_width
+            if remaining <= 0:
+                return y
+        return None
+
+    def _occupy(self, index, x, y, width):
+        """Raise the skyline over the placed rectangle."""
+        skyline = self._skyline
+        skyline.insert(index, [x, y, width])
+
+        right = x + width
+        i = index + 1
+        while i < len(skyline) and skyline[i][0] < right:
+            shrink = right - skyline[i][0]
+            skyline[i][0] += shrink
+            skyline[i][2] -= shrink
+            if skyline[i][2] > 0:
+                break
+            del skyline[i]
+
+        i = 0
+        while i < len(skyline) - 1:
+            if skyline[i][1] == skyline[i + 1][1]:
+                skyline[i][2] += skyline[i + 1][2]
+                del skyline[i + 1]
+            else:
+                i += 1
+
+
+class Atlas:
+    """Packs the frames of several grids into one or a few atlas pages.
+    The packing does not copy any pixels, it only computes the layout and
+    remaps the frame viewports. See pygameframe.build_atlas for the pygame
+    implementation which also copies the pixels.
+
+    Attributes:
+        page_width (int): The maximal page width.
+        page_height (int): The maximal page height.
+        padding (int): The gap between the frames in the page.
+        pages (list): The (width, height) tuples of the used page sizes.
+        placements (list): The (frame, page, x, y) tuples of each frame.
+            The frame viewport is the old one until the remap call.
+
+    Examples:
+        atlas = Atlas(g32.cells + g64.cells, 1024, 1024)
+        print(atlas.pages, atlas.waste)
+
+    """
+    def __init__(self, frames, page_width=2048, page_height=2048, padding=1):
+        """Pack the frames.
+
+        Args:
+            frames (list): The frames to pack. None and repeated items are
+                skipped, so the Grid.cells lists can be passed as is.
+            page_width (int, optional): The maximal page width.
+                Defaults to 2048.
+            page_height (int, optional): The maximal page height.
+                Defaults to 2048.
+            padding (int, optional): The gap between the frames in the page.
+                Defaults to 1.
+
+        """
+        self.page_width = page_width
+        self.page_height = page_height
+        self.padding = padding
+
+        unique = {id(frame): frame for frame in frames if frame is not None}
+        ordered = sorted(unique.values(),
+                         key=lambda frame: (frame.height, frame.width),
+                         reverse=True)
+
+        packers = []
+        self.placements = []
+        for frame in ordered:
+            width, height = frame.width + padding, frame.height + padding
+            if width - padding > page_width or height - padding > page_height:
+                raise ValueError('The frame {0} is bigger than the page'
+                                 .format(frame.get_viewport()))
+
+            for page, packer in enumerate(packers):
+                position = packer.insert(width, height)
+                if position is not None:
+                    break
+            else:
+                page, packer = len(packers), SkylinePacker(
+                    page_width + padding, page_height + padding)
+                packers.append(packer)
+                position = packer.insert(width, height)
+
+            self.placements.append((frame, page) + position)
+
+        self.pages = [(max(packer.used_width - padding, 0),
+                       max(packer.used_height - padding, 0))
+                      for packer in packers]
+
+    @property
+    def waste(self):
+        """The percentage of the page area not covered by the frames."""
+        total = sum(width * height for width, height in self.pages)
+        if total == 0:
+            return 0.0
+        used = sum(frame.width * frame.height
+                   for frame, _, _, _ in self.placements)
+        return 100.0 * (total - used) / total
+
+    def remap(self):
+        """Move the frame viewports to the atlas coordinates.
+        The image_width and image_height frame attributes become
+        the page size and the page index is stored in the atlas_page
+        frame attribute.
+
+        """
+        for frame, page, x, y in self.placements:
+            frame.x, frame.y = x, y
+            frame.image_width, frame.image_height = self.pages[page]
+            frame.atlas_page = page
+
+
+class AnimationTemplate:
+    """An immutable timeline which can be shared by many animations.
+    It keeps the frames, the durations and the intervals only once, so
+    thousands of animations playing the same cycle cost almost nothing.
+
+    Attributes:
+        frames (tuple): A tuple of frames.
+        durations (mapping): A read-only dictionary of the each
+            frame duration.
+        intervals (tuple): A tuple each element of which marks the start time
+            of the next frame.
+        total_duration (number): The total duration of the animation.
+
+    Examples:
+        walk = AnimationTemplate(grid('1-3', 1, 2, 1), 0.15)
+        npcs = [walk.spawn() for _ in range(10000)]
+
+    """
+    __slots__ = ('frames', 'durations', 'intervals', 'total_duration',
+                 '_frame_step')
+
+    def __init__(self, frames, durations):
+        """Initialize the template object.
+
+        Args:
+            frames (list): An array of frames
+                (which you can get by calling the Grid.get_frames function).
+            durations (int, float, list ,dictionary): The same as
+                the Animation durations argument.
+
+        """
+        durations = _parse_durations(durations, len(frames))
+        intervals, total_duration, frame_step = _parse_intervals(durations)
+
+        set_ = super().__setattr__
+        set_('frames', tuple(frames))
+        set_('durations', MappingProxyType(durations))
+        set_('intervals', tuple(intervals))
+        set_('total_duration', total_duration)
+        set_('_frame_step', frame_step)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('AnimationTemplate is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('AnimationTemplate is immutable')
+
+    @classmethod
+    def from_tables(cls, frames, durations, intervals, total_duration):
+        """Create the template from the already parsed timeline,
+        for example, loaded from a file. No parsing is done.
+
+        Args:
+            frames (list): An array of frames.
+            durations (list): The duration of each frame, or the
+                (frame index, duration) pairs in the order of the durations
+                dictionary (the intervals follow that order).
+            intervals (list): A list each element of which marks the start
+                time of the next frame.
+            total_duration (number): The total duration of the animation.
+
+        Returns:
+            The new template object.
+
+        >>> template = AnimationTemplate([0, 1, 2], {'2-3': 0.25, 1: 0.5})
+        >>> copy = AnimationTemplate.from_tables(
+        ...     template.frames, list(template.durations.items()),
+        ...     template.intervals, template.total_duration)
+        >>> dict(copy.durations) == dict(template.durations)
+        True
+        >>> copy.durations[0], copy.intervals
+        (0.5, (0.25, 0.5, 1.0))
+
+        """
+        durations = list(durations)
+        if durations and isinstance(durations[0], (list, tuple)):
+            durations = dict((index, duration)
+                             for index, duration in durations)
+        else:
+            durations = dict(enumerate(durations))
+
+        template = cls.__new__(cls)
+        set_ = super(AnimationTemplate, template).__setattr__
+        set_('frames', tuple(frames))
+        set_('durations', MappingProxyType(durations))
+        set_('intervals', tuple(intervals))
+        set_('total_duration', total_duration)
+        set_('_frame_step', _get_frame_step(durations.values()))
+        return template
+
+    def spawn(self, on_loop=None):
+        """Create a new animation which plays this template.
+
+        Args:
+            on_loop (function, optional): it will be called every time
+                the animation "loops".
+
+        Returns:
+            The new animation object. It is on the first frame.
+
+        """
+        animation = Animation.__new__(Animation)
+        animation._init(self, on_loop or _no_loop)
+        return animation
+
+    def quantize(self, tick_rate):
+        """Create the integer tick version of the template.
+
+        Args:
+            tick_rate (int): The number of ticks per second.
+
+        Returns:
+            The TickTemplate object, which shares the frames.
+
+        """
+        return TickTemplate(self, tick_rate)
+
+
+def _no_loop(loops):
+    """The default Animation.on_loop callback."""
+
+
+class LoopMethod:
+    """The on_loop callback which calls the method of its own animation,
+    for example, "pause_at_end". The animation is resolved when
+    the callback is attached, so the clones (and the group members) call
+    the method of themselves, not of the original.
+
+    Attributes:
+        name (str): The name of the Animation method without arguments.
+        animation (Animation): The animation the callback is bound to.
+
+    Examples:
+        >>> explosion = Animation([None, None], 1, LoopMethod('pause_at_end'))
+        >>> clone = explosion.clone()
+        >>> clone.update(2.5)
+        False
+        >>> clone.status, explosion.status
+        (1, 0)
+
+    """
+    __slots__ = ('name', 'animation')
+
+    def __init__(self, name, animation=None):
+        """Initialize the callback object.
+
+        Args:
+            name (str): The name of the Animation method.
+            animation (Animation, optional): The animation to bind to.
+
+        """
+        self.name = name
+        self.animation = animation
+
+    def bind(self, animation):
+        """Return the same callback bound to the given animation."""
+        return LoopMethod(self.name, animation)
+
+    def __call__(self, loops):
+        getattr(self.animation, self.name)()
+
+
+def _bind_on_loop(on_loop, animation):
+    """Bind the LoopMethod callback to the animation. The other callbacks
+    are kept as is."""
+    if isinstance(on_loop, LoopMethod):
+        return on_loop.bind(animation)
+    return on_loop
+
+
 class Animation:
     """Animations are groups of frames that are interchanged
     every now and then.
 
+    The timeline is kept by the AnimationTemplate, which can be shared.
+    The animation itself keeps only the playback state.
+
     Attributes:
+        template (AnimationTemplate): The timeline of the animation.
         durations (dict): A dictionary of the each frame duration.
-        intervals (list): A list each element of which marks the start time
+        intervals (tuple): A tuple each element of which marks the start time
             of the next frame.
         total_duration (number): The total duration of the animation.
         on_loop (function): it will be called every time an animation "loops".
 
-        frames (list): An array of frames
+        frames (tuple): A tuple of frames
             (which you can get by calling the Grid.get_frames function).
         timer (int): The current time of the animation.
         position (int): The current animation frame number.
         status (Status): The current animation status.
 
-        flipped_h (bool): Compatibility argument. Does not using yet.
-        flipped_v (bool): Compatibility argument. Does not using yet.
+        flipped_h (bool): Draw the frames flipped horizontally. Only
+            the transformable frames honor it.
+        flipped_v (bool): Draw the frames flipped vertically. Only
+            the transformable frames honor it.
+
+        mode (Playback): The playback mode. It is resolved over
+            the original timeline, so no frames are duplicated.
+            Defaults to Playback.loop.
+        speed (number): The playback speed multiplier. Defaults to 1.
 
     Examples:
         g32 = new_grid(PyGameFrame, 32, 32, 1024, 768, 3, 3, 1)
@@ -286,7 +839,10 @@ class Animation:
         ]
 
     """
-    def __init__(self, frames, durations, on_loop=lambda loops: None):
+    __slots__ = ('template', 'on_loop', 'timer', 'position', 'status',
+                 'flipped_h', 'flipped_v', 'mode', 'speed')
+
+    def __init__(self, frames, durations, on_loop=_no_loop):
         """Initialize the animation object.
 
         Args:
@@ -301,14 +857,16 @@ class Animation:
                 * When it's a list, you must specify a duration of the each
                 frame individually, like this: [0.2, 1, 0.3, 0.3, 0.3, 0.6]
             on_loop (function, optional): it will be called every time
-                an animation "loops". Default to an empty lambda.
+                an animation "loops". Default to an empty function.
 
         """
-        self.durations = _parse_durations(durations, len(frames))
-        self.intervals, self.total_duration = _parse_intervals(self.durations)
-        self.on_loop = on_loop
+        self._init(AnimationTemplate(frames, durations), on_loop)
+
+    def _init(self, template, on_loop):
+        """Reset the playback state and attach the given template."""
+        self.template = template
+        self.on_loop = _bind_on_loop(on_loop, self)
 
-        self.frames = frames[:]
         self.timer = 0
         self.position = 0
         self.status = Status.playing
@@ -316,6 +874,34 @@ class Animation:
         self.flipped_h = False
         self.flipped_v = False
 
+        self.mode = Playback.loop
+        self.speed = 1
+
+    @property
+    def frames(self):
+        return self.template.frames
+
+    @property
+    def durations(self):
+        return self.template.durations
+
+    @property
+    def intervals(self):
+        return self.template.intervals
+
+    @property
+    def total_duration(self):
+        return self.template.total_duration
+
+    @property
+    def cycle_duration(self):
+        """The duration of one loop in the current playback mode."""
+        if self.mode == Playback.ping_pong and len(self.intervals) > 2:
+            intervals = self.intervals
+            # The first and the last frames are played once per loop.
+            return intervals[-1] + intervals[-2] - intervals[0]
+        return self.template.total_duration
+
     def update(self, dt):
         """Use this function to change frames according to the time
         that has passed.
@@ -323,26 +909,63 @@ class Animation:
         Args:
             dt (float): Delta-time between two frames.
 
+        Returns:
+            True if the current frame has changed, so the animation
+            must be redrawn.
+
         """
         if self.status != Status.playing:
-            return
+            return False
+
+        if self.mode != Playback.loop:
+            return self._update_playback(dt)
 
-        self.timer += dt
-        loops = math.floor(self.timer / self.total_duration)
+        position = self.position
+        self.timer += dt * self.speed
+        template = self.template
+        loops = math.floor(self.timer / template.total_duration)
         if loops != 0:
-            self.timer -= self.total_duration * loops
+            self.timer -= template.total_duration * loops
             self.on_loop(loops)
 
-        self.position = self._seek_frame_index(self.intervals, self.timer)
+        self.position = self._seek_frame_index(template.intervals, self.timer,
+                                               position, template._frame_step)
+        return self.position != position
+
+    def _update_playback(self, dt):
+        """The update method of the playback modes other than the loop."""
+        position = self.position
+        self.timer += dt * self.speed
+        cycle = self.cycle_duration
+        loops = math.floor(self.timer / cycle)
+        if loops != 0:
+            if self.mode == Playback.once:
+                if loops > 0:
+                    self.pause_at_end()
+                else:
+                    self.pause_at_start()
+                self.on_loop(loops)
+                return self.position != position
+
+            self.timer -= cycle * loops
+            self.on_loop(loops)
+
+        self.position = self._seek_position(self.timer)
+        return self.position != position
 
     def draw(self, *args, **kwargs):
         """Draw the current frame.
         Args:
             You can specify any arguments, that you want. All of it will be
             passed to the current frame Frame.draw() method.
+            If the frame is transformable, the flip flags of the animation
+            are passed too.
 
         """
         frame = self.get_frame_info()
+        if frame.transformable:
+            kwargs['flip_h'] = self.flipped_h
+            kwargs['flip_v'] = self.flipped_v
         frame.draw(*args, **kwargs)
 
     def clone(self):
@@ -350,13 +973,17 @@ class Animation:
         The only difference is that its internal counter is reset to 0
         (it's on the first frame).
 
+        The template is shared, so cloning does not copy the frames.
+
         Returns:
             The new animation object.
 
         """
-        new_animation = Animation(self.frames, self.durations. self.on_loop)
+        new_animation = self.template.spawn(self.on_loop)
         new_animation.flipped_h = self.flipped_h
         new_animation.flipped_v = self.flipped_v
+        new_animation.mode = self.mode
+        new_animation.speed = self.speed
         return new_animation
 
     def get_frame_info(self):
@@ -372,21 +999,39 @@ class Animation:
 
         """
         self.position = position
-        self.timer = self.intervals[self.position]
+        if self.mode != Playback.reverse:
+            self.timer = self.intervals[self.position]
+        elif self.position == 0:
+            self.timer = 0
+        else:
+            self.timer = self.total_duration - self.intervals[position - 1]
 
     def pause(self):
         """Stop the animation from updating."""
         self.status = Status.paused
 
     def pause_at_end(self):
-        """Move the animation to its last frame and then pause it."""
+        """Move the animation to the last played frame and then pause it.
+        It is the first frame of the reverse and the second frame of
+        the ping-pong playback.
+
+        """
         self.position = len(self.frames) - 1
-        self.timer = self.total_duration
+        if self.mode == Playback.reverse:
+            self.position = 0
+        elif self.mode == Playback.ping_pong and self.position > 1:
+            self.position = 1
+        self.timer = self.cycle_duration
         self.pause()
 
     def pause_at_start(self):
-        """Move the animation to its first frame and then pause it."""
+        """Move the animation to the first played frame and then pause it.
+        It is the last frame of the reverse playback.
+
+        """
         self.position = 0
+        if self.mode == Playback.reverse:
+            self.position = len(self.frames) - 1
         self.timer = 0
         self.pause()
 
@@ -418,95 +1063,1157 @@ class Animation:
         self.flipped_v = not self.flipped_v
         return self
 
+    def _seek_position(self, timer):
+        """Find out the current frame index in the playback mode.
+
+        The reverse and the ping-pong playbacks are resolved over
+        the original intervals, so they show the same frames as the animation
+        with the reversed (or the mirrored) frames list.
+
+        Args:
+            timer (number): The time inside the loop of the playback.
+
+        Returns:
+            The frame index.
+
+        """
+        template = self.template
+        intervals = template.intervals
+        mode = self.mode
+
+        if mode == Playback.reverse:
+            index = bisect_right(intervals,
+                                 template.total_duration - timer) + 1
+            return index if index < len(intervals) else 0
+
+        if mode == Playback.ping_pong and len(intervals) > 2:
+            total = template.total_duration
+            if timer > total:
+                # The backward part: the frames from the penultimate
+                # to the second.
+                return bisect_right(intervals,
+                                    intervals[-2] - (timer - total)) + 1
+            index = bisect_left(intervals, timer) - 1
+            return index if index >= 0 else 1
+
+        return self._seek_frame_index(intervals, timer, self.position,
+                                      template._frame_step)
+
     @staticmethod
-    def _seek_frame_index(intervals, timer):
+    def _seek_frame_index(intervals, timer, position=None, step=None):
         """Find out the current animation frame index based on
         the animation time.
 
+        The search starts from the previous position (or from the position
+        computed from the step), moves forward a few frames and only then
+        falls back to the binary search. So for small dt it costs O(1).
+
         Args:
             intervals (list): A list each element of which marks the start time
                 of the next frame.
             timer (int): The current time of the animation.
+            position (int, optional): The previous frame index.
+            step (number, optional): The duration of each frame, if all of
+                the frames have the same duration.
 
         Returns:
             The frame index based on the gived arguments.
 
+        >>> intervals = [0.1, 0.2, 0.3]
+        >>> [Animation._seek_frame_index(intervals, t) for t in (0, 0.1, 0.25)]
+        [2, 2, 1]
+        >>> Animation._seek_frame_index(intervals, 0.25, 0)
+        1
+        >>> Animation._seek_frame_index(intervals, 0.25, step=0.1)
+        1
+
         """
-        for i in range(len(intervals) - 1, -1, -1):
-            if timer > intervals[i]:
-                return i
-        return len(intervals) - 1
+        count = len(intervals)
+        if step is not None:
+            position = max(int(timer / step) - 2, 0)
 
+        if position is not None and 0 <= position < count and \
+                intervals[position] < timer:
+            for _ in range(3):
+                if position + 1 == count or intervals[position + 1] >= timer:
+                    return position
+                position += 1
 
-def new_grid(*args, **kwargs):
-    """An alias for the Grid constructor."""
-    return Grid(*args, **kwargs)
+        index = bisect_left(intervals, timer) - 1
+        return index if index >= 0 else count - 1
 
 
-def new_animation(*args, **kwargs):
-    """An alias for the Animation constructor."""
-    return Animation(*args, **kwargs)
+class TickTemplate(AnimationTemplate):
+    """The template which timeline is quantized to integer ticks.
+    The frame of each tick is precomputed, so the TickAnimation update is
+    an integer add, a modulo and an index. The results do not depend on
+    the floating point rounding and are the same on every machine.
 
+    The frame ends are rounded to the nearest tick, so a frame shorter
+    than half of a tick can be skipped.
 
-def _parse_interval(s):
-    """Parse the given interval.
+    Attributes:
+        tick_rate (int): The number of ticks per second.
+        tick_intervals (tuple): A tuple each element of which marks the start
+            tick of the next frame.
+        total_ticks (int): The total duration of the animation in ticks.
+        tick_frames (tuple): The frame index of each tick.
 
-    Args:
-        s (int, str): It can be or just int, or interval (str) like '1-5'.
+    Examples:
+        walk = AnimationTemplate(grid('1-3', 1, 2, 1), 0.15).quantize(60)
+        witch = walk.spawn()
+        witch.update(1) # One tick.
 
-    Returns:
-        A tuple of:
-            * minimal interval value;
-            * maximal interval value;
-            * step.
-        The tuple can be passed to the range function.
+    """
+    __slots__ = ('tick_rate', 'tick_intervals', 'total_ticks', 'tick_frames')
 
-    >>> _parse_interval(4)
-    (3, 4, 1)
-    >>> _parse_interval('1-8')
-    (0, 8, 1)
-    >>> _parse_interval('7-2')
-    (6, 0, -1)
+    def __init__(self, template, tick_rate):
+        """Initialize the template object.
 
-    """
-    if type(s) == int:
-        return s - 1, s, 1
-    s = re.sub(r'\s+', '', s)
-    match = re.match(r'^(\d+)-(\d+)$', s)
+        Args:
+            template (AnimationTemplate): The template to quantize.
+            tick_rate (int): The number of ticks per second.
 
-    assert match is not None, 'Could not parse interval from "{0}"'.format(s)
+        >>> template = AnimationTemplate([0, 1, 2], 0.1).quantize(20)
+        >>> template.tick_intervals, template.tick_frames
+        ((2, 4, 6), (2, 2, 2, 0, 0, 1))
 
-    min_ = int(match.group(1))
-    max_ = int(match.group(2))
-    step = 1 if max_ >= min_ else -1
+        """
+        tick_intervals = tuple(round(interval * tick_rate)
+                               for interval in template.intervals)
+        total_ticks = round(template.total_duration * tick_rate)
+        if total_ticks <= 0:
+            raise ValueError('The animation is shorter than one tick')
+
+        set_ = super(AnimationTemplate, self).__setattr__
+        for name in AnimationTemplate.__slots__:
+            set_(name, getattr(template, name))
+        set_('tick_rate', tick_rate)
+        set_('tick_intervals', tick_intervals)
+        set_('total_ticks', total_ticks)
+        set_('tick_frames', tuple(
+            Animation._seek_frame_index(tick_intervals, tick)
+            for tick in range(total_ticks)))
+
+    def spawn(self, on_loop=None):
+        """Create a new tick animation which plays this template.
 
-    if step > 0:
-        min_ -= 1
-    elif step < 0:
-        min_ -= 1
-        max_ -= 2
+        Args:
+            on_loop (function, optional): it will be called every time
+                the animation "loops".
 
-    return min_, max_, step
+        Returns:
+            The new TickAnimation object. It is on the first frame.
 
+        """
+        animation = TickAnimation.__new__(TickAnimation)
+        animation._init(self, on_loop or _no_loop)
+        return animation
 
-def _parse_intervals(durations):
-    """Parse the given durations.
 
-    Args:
-        durations (dict): A dictionary of the each frame duration.
+class TickAnimation(Animation):
+    """The animation which timer counts integer ticks instead of seconds.
+    Use it for the fixed timestep simulations and replays.
 
-    Returns:
-        A tuple of:
-            * A list each element of which marks the start time
-              of the next frame.
-            * The total animation length.
+    The tick tables are precomputed for the loop playback, so the mode and
+    the speed attributes are ignored.
+
+    Attributes:
+        timer (int): The current tick of the animation.
+
+    """
+    __slots__ = ()
+
+    def __init__(self, frames, durations, tick_rate, on_loop=_no_loop):
+        """Initialize the animation object.
+
+        Args:
+            frames (list): An array of frames.
+            durations (int, float, list ,dictionary): The same as
+                the Animation durations argument, in seconds.
+            tick_rate (int): The number of ticks per second.
+            on_loop (function, optional): it will be called every time
+                an animation "loops". Default to an empty function.
+
+        """
+        self._init(TickTemplate(AnimationTemplate(frames, durations),
+                                tick_rate), on_loop)
+
+    def update(self, ticks=1):
+        """Use this function to change frames according to the ticks
+        that have passed.
+
+        Args:
+            ticks (int, optional): The number of ticks. Defaults to 1.
+
+        Returns:
+            True if the current frame has changed.
+
+        """
+        if self.status != Status.playing:
+            return False
+
+        template = self.template
+        position = self.position
+        timer = self.timer = self.timer + ticks
+        if not 0 <= timer < template.total_ticks:
+            loops, self.timer = divmod(timer, template.total_ticks)
+            self.on_loop(loops)
+            timer = self.timer
+            if not 0 <= timer < template.total_ticks:
+                # The callback has moved the timer, for example,
+                # with the pause_at_end method.
+                self.position = self._seek_frame_index(
+                    template.tick_intervals, timer)
+                return self.position != position
+
+        self.position = template.tick_frames[timer]
+        return self.position != position
+
+    def goto_frame(self, position):
+        """Move the animation to a given frame.
+
+        Args:
+            position (int): The frame index (starts from 0).
+
+        """
+        self.position = position
+        self.timer = self.template.tick_intervals[self.position]
+
+    def pause_at_end(self):
+        """Move the animation to its last frame and then pause it."""
+        super().pause_at_end()
+        self.timer = self.template.total_ticks
+
+
+class AnimationClock:
+    """The time source shared by many lazy animations.
+
+    Attributes:
+        time (number): The time passed since the clock creation.
+
+    """
+    def __init__(self):
+        """Initialize the clock object."""
+        self.time = 0
+
+    def update(self, dt):
+        """Advance the clock.
+
+        Args:
+            dt (float): Delta-time between two frames.
+
+        """
+        self.time += dt
+
+    def _on_resume(self, animation):
+        """Called by the lazy animation following the clock when it is
+        resumed."""
+
+
+class LazyAnimation(Animation):
+    """The animation which follows the AnimationClock and catches up
+    only when it is observed, so the animations which are not drawn cost
+    nothing. The on_loop callback gets all the loops passed since the last
+    observation at once.
+
+    The timer and the position attributes are brought up to date by
+    the get_frame_info, draw and sync methods only.
+
+    Attributes:
+        clock (AnimationClock): The clock the animation follows.
+        epoch (int): It is changed every time the timeline is moved
+            by the goto_frame, pause and resume methods.
+
+    Examples:
+        clock = AnimationClock()
+        crowd = [LazyAnimation(grid('1-3', 1, 2, 1), 0.15, clock)
+                 for _ in range(50000)]
+
+        clock.update(dt) # Instead of updating every animation.
+        for npc in visible: npc.draw(screen, image, x, y)
+
+    """
+    __slots__ = ('clock', 'epoch', '_synced')
+
+    # The catch-up of the observations is not an update call, so it is
+    # not measured as an update by the instrumentation.
+    _advance = Animation.update
+
+    def __init__(self, frames, durations, clock, on_loop=_no_loop):
+        """Initialize the animation object.
+
+        Args:
+            frames (list): An array of frames.
+            durations (int, float, list ,dictionary): The same as
+                the Animation durations argument.
+            clock (AnimationClock): The clock to follow.
+            on_loop (function, optional): it will be called every time
+                an animation "loops". Default to an empty function.
+
+        """
+        self._init(AnimationTemplate(frames, durations), on_loop)
+        self.clock = clock
+        self.epoch = 0
+        self._synced = clock.time
+
+    @classmethod
+    def from_template(cls, template, clock, on_loop=None):
+        """Create the lazy animation which plays the template.
+
+        Args:
+            template (AnimationTemplate): The timeline to play.
+            clock (AnimationClock): The clock to follow.
+            on_loop (function, optional): it will be called every time
+                the animation "loops".
+
+        Returns:
+            The new animation object.
+
+        """
+        animation = cls.__new__(cls)
+        animation._init(template, on_loop or _no_loop)
+        animation.clock = clock
+        animation.epoch = 0
+        animation._synced = clock.time
+        return animation
+
+    def sync(self):
+        """Apply the time passed since the last observation.
+
+        Returns:
+            True if the current frame has changed.
+
+        """
+        now = self.clock.time
+        dt = now - self._synced
+        self._synced = now
+        if dt:
+            return self._advance(dt)
+        return False
+
+    def update(self, dt=None):
+        """The lazy animation follows its clock, so this method only
+        applies the time passed by the clock. The dt argument is ignored.
+
+        Returns:
+            True if the current frame has changed.
+
+        """
+        return self.sync()
+
+    def get_frame_info(self):
+        """Return the currently active frame for the animation."""
+        self.sync()
+        return self.frames[self.position]
+
+    def clone(self):
+        """Creates a new lazy animation which follows the same clock.
+        Its internal counter starts from 0 at the current clock time.
+
+        Returns:
+            The new animation object.
+
+        >>> clock = AnimationClock()
+        >>> clone = LazyAnimation('abcd', 0.25, clock).clone()
+        >>> clock.update(0.625)
+        >>> clone.get_frame_info()
+        'b'
+
+        """
+        new_animation = LazyAnimation.from_template(self.template, self.clock,
+                                                    self.on_loop)
+        new_animation.flipped_h = self.flipped_h
+        new_animation.flipped_v = self.flipped_v
+        new_animation.mode = self.mode
+        new_animation.speed = self.speed
+        return new_animation
+
+    def goto_frame(self, position):
+        self.sync()
+        self.epoch += 1
+        super().goto_frame(position)
+
+    def pause(self):
+        self.sync()
+        self.epoch += 1
+        super().pause()
+
+    def pause_at_end(self):
+        self.sync()
+        self.epoch += 1
+        super().pause_at_end()
+
+    def pause_at_start(self):
+        self.sync()
+        self.epoch += 1
+        super().pause_at_start()
+
+    def resume(self):
+        """Unpause the animation. The time passed on the pause is skipped."""
+        self._synced = self.clock.time
+        self.epoch += 1
+        super().resume()
+        self.clock._on_resume(self)
+
+
+class AnimationGroup(AnimationClock):
+    """The animations which share one timer. The group update only
+    advances the shared time, and each member finds its frame from
+    the shared time by its own interval table when it is observed.
+    So the update costs the same for any number of members, and the members
+    keep the phase: switching the active member continues from the same
+    time.
+
+    The members are the lazy animations following the group. Pausing
+    a member separates it from the shared time until it is resumed.
+
+    Attributes:
+        members (dict): The member LazyAnimation objects by their keys.
+        active: The key of the active member or None.
+        status (Status): The current group status.
+
+    Examples:
+        move = AnimationGroup({
+            'down': Animation(grid('1-3', 1, 2, 1), 0.15),
+            'up': Animation(grid('1-3', 4, 2, 4), 0.15),
+        }, active='down')
+
+        move.update(dt)
+        move.switch('up') # Continues the walk cycle from the same phase.
+        move.draw(canvas, image, player_x, player_y)
+
+    """
+    def __init__(self, members=None, active=None):
+        """Initialize the group object.
+
+        Args:
+            members (dict, optional): The animations or the animation
+                templates by their keys.
+            active (optional): The key of the active member.
+
+        """
+        super().__init__()
+        self.members = {}
+        self.active = active
+        self.status = Status.playing
+
+        for key, animation in (members or {}).items():
+            self.add(key, animation)
+
+    def __len__(self):
+        return len(self.members)
+
+    def __getitem__(self, key):
+        return self.members[key]
+
+    @property
+    def current(self):
+        """The active member."""
+        return self.members[self.active]
+
+    def add(self, key, animation, on_loop=None):
+        """Add the member, which starts in the phase of the group.
+
+        Args:
+            key: The hashable key of the member.
+            animation (Animation, AnimationTemplate): The animation whose
+                timeline, callback and flip flags the member takes,
+                or the template.
+            on_loop (function, optional): it will be called every time
+                the member "loops". Defaults to the animation callback.
+
+        Returns:
+            The new member.
+
+        """
+        template = getattr(animation, 'template', animation)
+        if on_loop is None:
+            on_loop = getattr(animation, 'on_loop', None)
+
+        member = LazyAnimation.from_template(template, self, on_loop)
+        # The member follows the group time from its start.
+        member._synced = 0
+        member.flipped_h = getattr(animation, 'flipped_h', False)
+        member.flipped_v = getattr(animation, 'flipped_v', False)
+        self.members[key] = member
+        return member
+
+    def switch(self, key):
+        """Make another member active. It keeps the phase of the group.
+
+        Args:
+            key: The key of the member.
+
+        Returns:
+            The active member.
+
+        """
+        self.active = key
+        return self.members[key]
+
+    def update(self, dt):
+        """Advance the shared time.
+
+        Args:
+            dt (float): Delta-time between two frames.
+
+        Returns:
+            True if the frame of the active member has changed.
+
+        """
+        if self.status != Status.playing:
+            return False
+
+        self.time += dt
+        if self.active is None:
+            return False
+        return self.current.sync()
+
+    def draw(self, *args, **kwargs):
+        """Draw the current frame of the active member.
+        Args:
+            The same as the Animation.draw() method arguments.
+
+        """
+        self.current.draw(*args, **kwargs)
+
+    def get_frame_info(self):
+        """Return the currently active frame of the active member."""
+        return self.current.get_frame_info()
+
+    def pause(self):
+        """Stop advancing the shared time."""
+        self.status = Status.paused
+
+    def resume(self):
+        """Continue advancing the shared time."""
+        self.status = Status.playing
+
+
+class EventScheduler(AnimationClock):
+    """The clock which calls the frame and loop callbacks of the lazy
+    animations following it. The events are kept in a heap by their time,
+    so each update costs only the events which fire.
+
+    The callbacks are called with the animation and the exact clock time
+    of the event. If several events happen inside one update, all of them
+    are called in the time order. The event of the paused animation waits
+    for its resume method, the events of the animation moved by goto_frame are
+    rescheduled. The events are scheduled for the loop playback at
+    the speed 1.
+
+    Examples:
+        scheduler = EventScheduler()
+        witch = LazyAnimation(grid('1-3', 1, 2, 1), 0.15, scheduler)
+        scheduler.on_frame(witch, 1, lambda animation, time: play_step())
+
+        scheduler.update(dt)
+
+    """
+    def __init__(self):
+        """Initialize the scheduler object."""
+        super().__init__()
+        self._events = []
+        self._sleeping = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._events) + sum(map(len, self._sleeping.values()))
+
+    def on_frame(self, animation, position, callback):
+        """Call the callback every time the animation enters the frame.
+        The frame is shown after its start time, so the callback is called
+        on the first update after it, when the animation shows the frame.
+
+        Args:
+            animation (LazyAnimation): The animation following this clock.
+            position (int): The frame index (starts from 0).
+            callback (function): It gets the animation and the event time.
+
+        Returns:
+            The event handle, which can be passed to the cancel method.
+
+        >>> scheduler = EventScheduler()
+        >>> animation = LazyAnimation('abcd', 0.25, scheduler)
+        >>> _ = scheduler.on_frame(animation, 1, lambda animation, time:
+        ...     print(time, scheduler.time, animation.get_frame_info()))
+        >>> for _ in range(6):
+        ...     scheduler.update(0.125)
+        0.5 0.625 b
+
+        """
+        intervals = animation.intervals
+        offset = intervals[position] if position < len(intervals) - 1 else 0
+        return self._add(_ScheduledEvent(animation, offset, callback, True))
+
+    def on_loop(self, animation, callback):
+        """Call the callback every time the animation loops.
+
+        Args:
+            animation (LazyAnimation): The animation following this clock.
+            callback (function): It gets the animation and the event time.
+
+        Returns:
+            The event handle, which can be passed to the cancel method.
+
+        """
+        return self._add(_ScheduledEvent(animation, 0, callback))
+
+    def cancel(self, event):
+        """Stop calling the event callback.
+
+        Args:
+            event: The handle returned by the on_frame or on_loop method.
+
+        """
+        event.cancelled = True
+
+    def update(self, dt):
+        """Advance the clock and call the events which have happened.
+
+        Args:
+            dt (float): Delta-time between two frames.
+
+        """
+        self.time += dt
+
+        events = self._events
+        waiting = []
+        while events and events[0][0] <= self.time:
+            entry = heapq.heappop(events)
+            time_, _, event = entry
+            if event.cancelled:
+                continue
+            if event.strict and time_ == self.time:
+                waiting.append(entry)
+                continue
+            if event.epoch != event.animation.epoch:
+                self._schedule(event)
+                continue
+            event.callback(event.animation, time_)
+            self._push(time_ + event.animation.total_duration, event)
+
+        for entry in waiting:
+            heapq.heappush(events, entry)
+
+    def _add(self, event):
+        """Register the new event."""
+        assert event.animation.clock is self, \
+            'The animation must follow the scheduler'
+        self._schedule(event)
+        return event
+
+    def _schedule(self, event):
+        """Find the next time of the event after the current time."""
+        if event.cancelled:
+            return
+
+        animation = event.animation
+        event.epoch = animation.epoch
+        if animation.status != Status.playing:
+            self._sleeping.setdefault(animation, []).append(event)
+            return
+
+        total = animation.total_duration
+        phase = (animation.timer + self.time - animation._synced) % total
+        wait = (event.offset - phase) % total
+        if not wait and not event.strict:
+            wait = total
+        self._push(self.time + wait, event)
+
+    def _on_resume(self, animation):
+        """Schedule the events which have waited for the resume."""
+        for event in self._sleeping.pop(animation, ()):
+            self._schedule(event)
+
+    def _push(self, time_, event):
+        heapq.heappush(self._events, (time_, next(self._counter), event))
+
+
+class _ScheduledEvent:
+    """The frame or loop callback registered in the EventScheduler.
+    The strict events are called only after their time, not at it.
+
+    """
+    __slots__ = ('animation', 'offset', 'callback', 'strict', 'epoch',
+                 'cancelled')
+
+    def __init__(self, animation, offset, callback, strict=False):
+        self.animation = animation
+        self.offset = offset
+        self.callback = callback
+        self.strict = strict
+        self.epoch = animation.epoch
+        self.cancelled = False
+
+
+class PooledAnimation(Animation):
+    """An animation which state is stored in the AnimationPool arrays.
+    It supports the whole Animation API, but the timer, the position
+    and the status are read and written directly to the pool.
+
+    Attributes:
+        pool (AnimationPool): The pool that keeps the animation state.
+
+    """
+    __slots__ = ('pool', '_index')
+
+    def __init__(self, pool, index, animation):
+        """Initialize the pooled animation object.
+
+        Args:
+            pool (AnimationPool): The pool that keeps the animation state.
+            index (int): The index of the animation in the pool arrays.
+            animation (Animation): The source animation. Its template
+                is shared, not copied.
+
+        """
+        self.pool = pool
+        self._index = index
+
+        self.template = animation.template
+        self.on_loop = _bind_on_loop(animation.on_loop, self)
+
+        self.flipped_h = animation.flipped_h
+        self.flipped_v = animation.flipped_v
+
+        self.mode = Playback.loop
+        self.speed = 1
+
+    @property
+    def timer(self):
+        return float(self.pool._timers[self._index])
+
+    @timer.setter
+    def timer(self, value):
+        self.pool._timers[self._index] = value
+
+    @property
+    def position(self):
+        return int(self.pool._positions[self._index])
+
+    @position.setter
+    def position(self, value):
+        self.pool._positions[self._index] = value
+
+    @property
+    def status(self):
+        return int(self.pool._statuses[self._index])
+
+    @status.setter
+    def status(self, value):
+        self.pool._statuses[self._index] = value
+
+
+class AnimationPool:
+    """Keeps the state of many animations in flat NumPy arrays and advances
+    all of them with a single update call. Requires numpy.
+
+    Animations which have the same intervals share one interval table, so
+    the frames of the whole group are resolved with one searchsorted call.
+
+    Attributes:
+        timers (numpy.ndarray): The current time of each animation.
+        positions (numpy.ndarray): The current frame number of each animation.
+        statuses (numpy.ndarray): The current status of each animation.
+        total_durations (numpy.ndarray): The total duration of
+            each animation.
+
+    Examples:
+        pool = AnimationPool()
+        spinning = [pool.add(new_animation(g32('1-8', 1), 0.1))
+                    for _ in range(10000)]
+
+        pool.update(dt)
+        for i, spin in enumerate(spinning):
+            spin.draw(screen, image, i * 75, i * 50)
+
+    """
+    def __init__(self, capacity=64):
+        """Initialize the pool object.
+
+        Args:
+            capacity (int, optional): The number of animations the pool can
+                keep before its arrays grow. Defaults to 64.
+
+        """
+        if np is None:
+            raise RuntimeError('AnimationPool requires numpy.')
+
+        capacity = max(capacity, 1)
+        self._timers = np.zeros(capacity, dtype=np.float64)
+        self._positions = np.zeros(capacity, dtype=np.intp)
+        self._statuses = np.zeros(capacity, dtype=np.int8)
+        self._total_durations = np.ones(capacity, dtype=np.float64)
+
+        self._members = []
+        self._timelines = {}
+
+    @property
+    def timers(self):
+        return self._timers[:len(self._members)]
+
+    @property
+    def positions(self):
+        return self._positions[:len(self._members)]
+
+    @property
+    def statuses(self):
+        return self._statuses[:len(self._members)]
+
+    @property
+    def total_durations(self):
+        return self._total_durations[:len(self._members)]
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):
+        return iter(self._members)
+
+    def add(self, animation):
+        """Move the animation state into the pool.
+
+        Args:
+            animation (Animation): The animation to add. Its current timer,
+                position and status are copied into the pool.
+
+        Returns:
+            The PooledAnimation object, which should be used instead of
+            the given animation from now on.
+
+        """
+        if isinstance(animation, (TickAnimation, LazyAnimation)):
+            raise TypeError('AnimationPool does not support {0}'.format(
+                type(animation).__name__))
+        if animation.mode != Playback.loop or animation.speed != 1:
+            raise ValueError('AnimationPool supports only the loop playback '
+                             'at the speed 1')
+
+        index = len(self._members)
+        if index == len(self._timers):
+            self._grow(index * 2)
+
+        self._timers[index] = animation.timer
+        self._positions[index] = animation.position
+        self._statuses[index] = animation.status
+        self._total_durations[index] = animation.total_duration
+
+        member = PooledAnimation(self, index, animation)
+        self._members.append(member)
+        self._get_timeline(member).add(index)
+        return member
+
+    def remove(self, member):
+        """Remove the animation from the pool. The last animation takes
+        the place of the removed one, so the removal is O(1).
+        The removed animation must not be used after that.
+
+        Args:
+            member (PooledAnimation): The animation returned by the add method.
+
+        """
+        assert member.pool is self, 'The animation is not in this pool'
+
+        index, last = member._index, len(self._members) - 1
+
+        self._get_timeline(member).discard(index)
+        if index != last:
+            moved = self._members[last]
+            timeline = self._get_timeline(moved)
+            timeline.discard(last)
+            timeline.add(index)
+
+            self._timers[index] = self._timers[last]
+            self._positions[index] = self._positions[last]
+            self._statuses[index] = self._statuses[last]
+            self._total_durations[index] = self._total_durations[last]
+
+            moved._index = index
+            self._members[index] = moved
+        self._members.pop()
+        member.pool = None
+
+    def update(self, dt):
+        """Advance every playing animation in the pool.
+
+        Args:
+            dt (float): Delta-time between two frames.
+
+        Returns:
+            The boolean array which is True for the members whose frame
+            has changed, in the iteration order of the pool.
+
+        The pool advances its members the same way as Animation.update:
+
+        >>> def make(loops):
+        ...     animations = [Animation('abcd', [0.25, 0.5, 0.25, 0.5]),
+        ...                   Animation('xyz', 0.25), Animation('ab', 0.5)]
+        ...     for i, animation in enumerate(animations):
+        ...         animation.on_loop = lambda n, i=i: loops.append((i, n))
+        ...     animations[2].pause()
+        ...     return animations
+        >>> def get_state(animations):
+        ...     return [(a.position, a.timer) for a in animations]
+        >>> loops, pool_loops, pool = [], [], AnimationPool(capacity=1)
+        >>> animations = make(loops)
+        >>> members = [pool.add(animation) for animation in make(pool_loops)]
+        >>> for dt in (0.25, 0.5, 0.75, 1.25, 2.5):
+        ...     changed = [animation.update(dt) for animation in animations]
+        ...     print(pool.update(dt).tolist() == changed,
+        ...           get_state(members) == get_state(animations))
+        True True
+        True True
+        True True
+        True True
+        True True
+        >>> pool_loops == loops
+        True
+        >>> loops
+        [(1, 1), (0, 1), (1, 1), (1, 1), (0, 2), (1, 4)]
+
+        """
+        count = len(self._members)
+        previous = self._positions[:count].copy()
+        if count == 0:
+            return previous != 0
+
+        timers = self._timers[:count]
+        totals = self._total_durations[:count]
+        playing = self._statuses[:count] == Status.playing
+
+        np.add(timers, dt, out=timers, where=playing)
+        loops = np.floor(timers / totals)
+        loops[~playing] = 0
+        timers -= totals * loops
+
+        for index in np.flatnonzero(loops):
+            self._members[index].on_loop(int(loops[index]))
+
+        positions = self._positions[:count]
+        for timeline in self._timelines.values():
+            indices = timeline.get_indices()
+            if len(indices) == 0:
+                continue
+            found = timeline.seek(timers[indices])
+            positions[indices] = np.where(playing[indices],
+                                          found, positions[indices])
+        return positions != previous
+
+    def _grow(self, capacity):
+        """Reallocate the state arrays to the given capacity."""
+        def resized(array, fill):
+            result = np.full(capacity, fill, dtype=array.dtype)
+            result[:len(array)] = array
+            return result
+
+        self._timers = resized(self._timers, 0)
+        self._positions = resized(self._positions, 0)
+        self._statuses = resized(self._statuses, 0)
+        self._total_durations = resized(self._total_durations, 1)
+
+    def _get_timeline(self, member):
+        """Return the shared timeline of the given member."""
+        key = member.intervals
+        if key not in self._timelines:
+            self._timelines[key] = _PoolTimeline(member.intervals)
+        return self._timelines[key]
+
+
+class _PoolTimeline:
+    """An interval table shared by the pool members with the same intervals.
+
+    """
+    def __init__(self, intervals):
+        self.intervals = np.asarray(intervals, dtype=np.float64)
+        self.members = set()
+        self._indices = None
+
+    def add(self, index):
+        self.members.add(index)
+        self._indices = None
+
+    def discard(self, index):
+        self.members.discard(index)
+        self._indices = None
+
+    def get_indices(self):
+        if self._indices is None:
+            self._indices = np.fromiter(self.members, dtype=np.intp,
+                                        count=len(self.members))
+        return self._indices
+
+    def seek(self, timers):
+        """The vectorized version of the Animation._seek_frame_index."""
+        result = np.searchsorted(self.intervals, timers, side='left') - 1
+        result[result < 0] = len(self.intervals) - 1
+        return result
+
+
+class RenderBatch:
+    """Collects the draws of many animations and submits them with
+    a single blits call per target surface (like pygame.Surface.blits).
+
+    The draws are sorted by layer. The draws of the same layer are grouped
+    by the image, the order of the draws from the same image is kept.
+
+    Examples:
+        batch = RenderBatch()
+        for i, spin in enumerate(spinning):
+            batch.add(spin, screen, image, i * 75, i * 50)
+        batch.add(plane, screen, image, 100, 400, layer=1)
+        batch.flush()
+
+    """
+    def __init__(self):
+        """Initialize the batch object."""
+        self._targets = {}
+
+    def __len__(self):
+        return sum(len(draws) for draws in self._targets.values())
+
+    def add(self, animation, target, image, x, y, layer=0, **kwargs):
+        """Queue the current frame of the animation.
+
+        Args:
+            animation (Animation): The animation to draw.
+            target: The surface to draw on.
+            image: The image where all the frames are.
+            x (number): The left coordinate on the target.
+            y (number): The top coordinate on the target.
+            layer (int, optional): The draws with the bigger layer are drawn
+                later. Defaults to 0.
+            kwargs: Any other arguments for the Frame.get_blit method.
+
+        """
+        frame = animation.get_frame_info()
+        if frame.transformable:
+            kwargs['flip_h'] = animation.flipped_h
+            kwargs['flip_v'] = animation.flipped_v
+        source, area, dx, dy = frame.get_blit(image, **kwargs)
+
+        draws = self._targets.get(target)
+        if draws is None:
+            draws = self._targets[target] = []
+        draws.append((layer, id(image), len(draws),
+                      (source, (x + dx, y + dy), area)))
+
+    def flush(self):
+        """Draw all the queued frames and clear the batch."""
+        for target, draws in self._targets.items():
+            draws.sort(key=_get_draw_order)
+            target.blits([draw[3] for draw in draws], doreturn=False)
+        self._targets.clear()
+
+    def clear(self):
+        """Drop all the queued frames without drawing."""
+        self._targets.clear()
+
+
+def _get_draw_order(draw):
+    """Return the sort key of the RenderBatch draw."""
+    return draw[:3]
+
+
+def new_grid(*args, **kwargs):
+    """An alias for the Grid constructor."""
+    return Grid(*args, **kwargs)
+
+
+def new_animation(*args, **kwargs):
+    """An alias for the Animation constructor."""
+    return Animation(*args, **kwargs)
+
+
+def _parse_interval(s):
+    """Parse the given interval.
+
+    Args:
+        s (int, str): It can be or just int, or interval (str) like '1-5'.
+
+    Returns:
+        A tuple of:
+            * minimal interval value;
+            * maximal interval value;
+            * step.
+        The tuple can be passed to the range function.
+
+    >>> _parse_interval(4)
+    (3, 4, 1)
+    >>> _parse_interval('1-8')
+    (0, 8, 1)
+    >>> _parse_interval('7-2')
+    (6, 0, -1)
+
+    """
+    if type(s) == int:
+        return s - 1, s, 1
+
+    result = _parsed_intervals.get(s)
+    if result is not None:
+        return result
+
+    match = _INTERVAL_RE.match(_SPACES_RE.sub('', s))
+
+    assert match is not None, 'Could not parse interval from "{0}"'.format(s)
+
+    min_ = int(match.group(1))
+    max_ = int(match.group(2))
+    step = 1 if max_ >= min_ else -1
+
+    if step > 0:
+        min_ -= 1
+    elif step < 0:
+        min_ -= 1
+        max_ -= 2
+
+    result = _parsed_intervals[s] = min_, max_, step
+    return result
+
+
+def _parse_intervals(durations):
+    """Parse the given durations.
+
+    Args:
+        durations (dict): A dictionary of the each frame duration.
+
+    Returns:
+        A tuple of:
+            * A list each element of which marks the start time
+              of the next frame.
+            * The total animation length.
+            * The duration of each frame, if all of the frames have the same
+              duration, None otherwise. It allows to find the frame index
+              without a search.
+
+    >>> _parse_intervals({0: 1, 1: 1, 2: 1})
+    ([1, 2, 3], 3, 1)
+    >>> _parse_intervals({0: 1, 1: 2})
+    ([1, 3], 3, None)
 
     """
     result, time_ = [], 0
     for _, duration in durations.items():
         time_ += duration
         result.append(time_)
-    return result, time_
+
+    return result, time_, _get_frame_step(durations.values())
+
+
+def _get_frame_step(durations):
+    """Return the duration of each frame, if all of the frames have
+    the same positive duration, None otherwise.
+
+    >>> _get_frame_step([0.1, 0.1]), _get_frame_step([0.1, 0.2])
+    (0.1, None)
+
+    """
+    steps = set(durations)
+    step = steps.pop() if len(steps) == 1 else None
+    if step is not None and step <= 0:
+        return None
+    return step
 
 
 def _parse_durations(durations, frames_count):
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""The asyncio driver of the animations.
+
+One driver task advances all the registered animations, so thousands of
+coroutines waiting for the animations do not create their own timers:
+they wait for the futures which the driver resolves after its ticks.
+
+Examples:
+    driver = AsyncDriver(fps=30)
+    driver.add(explosion)
+    driver.start()
+
+    await driver.frame(explosion, 3) # Play the sound on the 4th frame.
+    await driver.finished(explosion) # Remove the sprite.
+
+"""
+import asyncio
+from bisect import bisect_left, bisect_right
+import itertools
+import math
+
+from anim10 import Playback, Status
+
+
+class AsyncDriver:
+    """Advances the registered animations on the asyncio event loop.
+
+    Attributes:
+        fps (number): The number of the ticks per second.
+
+    """
+    def __init__(self, fps=60):
+        """Initialize the driver object.
+
+        Args:
+            fps (number, optional): The number of the ticks per second.
+                Defaults to 60.
+
+        """
+        self.fps = fps
+        self._tracks = {}
+        self._waiting = set()
+        self._task = None
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def add(self, animation):
+        """Start advancing the animation.
+
+        Args:
+            animation (Animation): The animation to advance.
+
+        """
+        if id(animation) not in self._tracks:
+            self._tracks[id(animation)] = _Track(animation)
+
+    def remove(self, animation):
+        """Stop advancing the animation. Its waiters are cancelled.
+
+        Args:
+            animation (Animation): The animation to remove.
+
+        """
+        track = self._tracks.pop(id(animation), None)
+        if track is not None:
+            track.close()
+            self._waiting.discard(track)
+
+    def finished(self, animation):
+        """Wait until the animation loops. Then the animation is paused
+        at its end. The paused animation is finished at once.
+
+        Args:
+            animation (Animation): The registered animation.
+
+        Returns:
+            The awaitable future.
+
+        """
+        future = asyncio.get_running_loop().create_future()
+        if animation.status != Status.playing:
+            future.set_result(None)
+            return future
+
+        track = self._tracks[id(animation)]
+        if not track.finished:
+            track.loops = 0
+        track.finished.append(future)
+        self._waiting.add(track)
+        return future
+
+    def frame(self, animation, position):
+        """Wait until the animation shows the frame. The frames shorter
+        than a tick are caught too.
+
+        Args:
+            animation (Animation): The registered animation.
+            position (int): The frame index (starts from 0).
+
+        Returns:
+            The awaitable future.
+
+        """
+        future = asyncio.get_running_loop().create_future()
+        if animation.position == position:
+            future.set_result(None)
+            return future
+
+        track = self._tracks[id(animation)]
+        track.frames.append((position, future))
+        self._waiting.add(track)
+        return future
+
+    def update(self, dt):
+        """Advance all the animations and resolve the waiters.
+
+        Args:
+            dt (float): Delta-time between two ticks.
+
+        """
+        for track in self._tracks.values():
+            track.update(dt)
+
+        if self._waiting:
+            self._waiting = {track for track in self._waiting
+                             if track.resolve()}
+
+    def start(self):
+        """Start the driver task on the running event loop.
+
+        Returns:
+            The driver task.
+
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+        return self._task
+
+    def stop(self):
+        """Cancel the driver task."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self):
+        """Advance the animations until cancelled."""
+        loop = asyncio.get_running_loop()
+        timestamp = loop.time()
+        while True:
+            await asyncio.sleep(1 / self.fps)
+            now = loop.time()
+            self.update(now - timestamp)
+            timestamp = now
+
+
+class _Track:
+    """The registered animation and its waiters.
+
+    The loops and the shown frames are found from the timer before and
+    after the update, so the on_loop callback of the animation (which is
+    copied by the clones) is not touched.
+
+    """
+    def __init__(self, animation):
+        self.animation = animation
+        self.loops = 0
+        self.finished = []
+        self.frames = []
+        self.shown = set()
+
+    def update(self, dt):
+        """Advance the animation and remember its loops and the frames
+        shown since the last resolve.
+
+        Args:
+            dt (float): Delta-time between two ticks.
+
+        """
+        animation = self.animation
+        if not (self.frames or self.finished) or \
+                animation.status != Status.playing:
+            animation.update(dt)
+            return
+
+        timer = animation.timer
+        elapsed = dt * animation.speed
+        cycle = animation.cycle_duration
+        animation.update(dt)
+
+        self.loops += abs(math.floor((timer + elapsed) / cycle))
+        if self.frames:
+            self.shown.update(_get_shown_frames(animation, timer, elapsed))
+
+    def resolve(self):
+        """Resolve the waiters which are ready.
+
+        Returns:
+            Whether there are waiters left.
+
+        """
+        animation = self.animation
+
+        if self.frames:
+            self.shown.add(animation.position)
+            waiting = []
+            for position, future in self.frames:
+                if future.done():
+                    continue
+                if position in self.shown:
+                    future.set_result(None)
+                else:
+                    waiting.append((position, future))
+            self.frames = waiting
+        self.shown.clear()
+
+        if self.finished and self.loops:
+            animation.pause_at_end()
+            for future in self.finished:
+                if not future.done():
+                    future.set_result(None)
+            self.finished = []
+        self.loops = 0
+
+        return bool(self.frames or self.finished)
+
+    def close(self):
+        """Cancel the waiters."""
+        for future in self.finished:
+            future.cancel()
+        for _, future in self.frames:
+            future.cancel()
+        self.finished, self.frames = [], []
+
+
+def _get_shown_frames(animation, timer, elapsed):
+    """Return the frames the animation has shown while its timer advanced
+    from the given timer by the elapsed time.
+
+    The playback modes show the same frames as the loop over the frames
+    in their playback order, so the order is walked from the frame after
+    the first timer to the frame of the last one.
+
+    """
+    order = list(range(len(animation.frames)))
+    if animation.mode == Playback.reverse:
+        order.reverse()
+    elif animation.mode == Playback.ping_pong and len(order) > 2:
+        order += order[-2:0:-1]
+
+    intervals = animation.intervals
+    durations = [end - start
+                 for start, end in zip((0,) + tuple(intervals), intervals)]
+    intervals = list(itertools.accumulate(durations[i] for i in order))
+    count, cycle = len(order), intervals[-1]
+
+    low, high = sorted((timer, timer + elapsed))
+    if animation.mode == Playback.once:
+        low, high = max(low, 0), min(high, cycle)
+        wrapped = False
+    elif high - low >= cycle:
+        return set(order)
+    else:
+        wrapped = math.floor(high / cycle) != math.floor(low / cycle)
+        low, high = low % cycle, high % cycle
+    if low >= high and not wrapped:
+        return set()
+
+    # The same search as in Animation._seek_frame_index: the frame is
+    # shown after its interval starts, the last one before the first.
+    first = (bisect_right(intervals, low) - 1) % count
+    last = (bisect_left(intervals, high) - 1) % count
+    if wrapped and first == last:
+        return set(order)
+    return {order[(first + i) % count]
+            for i in range((last - first) % count + 1)}
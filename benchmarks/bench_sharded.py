@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Scaling of the sharded animation update with the number of workers.
+
+Run the benchmark and save the results:
+    python benchmarks/bench_sharded.py -n 200000 -o sharded.json
+
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from anim10 import AnimationTemplate  # noqa: E402
+from sharded import ShardedAnimations  # noqa: E402
+
+
+def get_worker_counts(limit):
+    """Return 1, 2, 4, ... up to the limit (the limit is included)."""
+    counts, count = [], 1
+    while count < limit:
+        counts.append(count)
+        count *= 2
+    counts.append(limit)
+    return counts
+
+
+def bench_workers(count, workers, ticks, dt=1 / 60):
+    templates = [AnimationTemplate(range(frames), 0.1)
+                 for frames in (4, 8, 16, 64)]
+    template_ids = [i % len(templates) for i in range(count)]
+
+    with ShardedAnimations(templates, template_ids, workers) as state:
+        state.update(dt)  # Warm up the workers.
+        start = time.perf_counter()
+        for _ in range(ticks):
+            state.update(dt)
+        elapsed = time.perf_counter() - start
+
+    return {'seconds': elapsed / ticks,
+            'ops_per_second': count * ticks / elapsed}
+
+
+def run(count, ticks, max_workers):
+    results = {}
+    for workers in get_worker_counts(max_workers):
+        results['sharded/{0}x{1}'.format(count, workers)] = bench_workers(
+            count, workers, ticks)
+
+    single = results['sharded/{0}x1'.format(count)]['seconds']
+    for result in results.values():
+        result['speedup'] = single / result['seconds']
+
+    return {'python': sys.version.split()[0], 'cpus': os.cpu_count(),
+            'results': results}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-o', '--output', help='the results JSON file')
+    parser.add_argument('-n', '--count', type=int, default=200000,
+                        help='the number of the animations')
+    parser.add_argument('--ticks', type=int, default=100,
+                        help='the number of the measured updates')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='the largest number of the workers')
+    args = parser.parse_args(argv[1:])
+
+    results = run(args.count, args.ticks, args.workers)
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as file_:
+            file_.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
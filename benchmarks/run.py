@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Headless benchmarks of the anim10 hot paths.
+
+Run the benchmarks and save the results:
+    python benchmarks/run.py -o results.json
+
+Compare two results and fail if anything is slower than the threshold:
+    python benchmarks/run.py --compare baseline.json results.json
+
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from anim10 import Animation, Frame, Grid  # noqa: E402
+
+MEDIA = os.path.join(ROOT, 'media', '1945.png')
+
+
+class StubFrame(Frame):
+    """The frame which does not depend on any graphics library."""
+    def create_frame(self, width, height):
+        return None
+
+    def draw(self, *args, **kwargs):
+        pass
+
+
+def measure(function, repeat=5):
+    """Return the best time of the function call in seconds."""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_update(results, counts, frame_counts, ticks=60):
+    grid = Grid(StubFrame, 1, 1, 1024, 1024)
+    for frames_count in frame_counts:
+        frames = grid.get_frames('1-{0}'.format(frames_count), 1)
+        for count in counts:
+            animations = [Animation(frames, 0.1) for _ in range(count)]
+
+            def run():
+                for _ in range(ticks):
+                    for animation in animations:
+                        animation.update(0.016)
+
+            elapsed = measure(run)
+            name = 'update/{0}x{1}'.format(count, frames_count)
+            results[name] = {'seconds': elapsed,
+                             'ops_per_second': count * ticks / elapsed}
+
+
+def bench_draw(results, count=2000):
+    try:
+        import pygame
+    except ImportError:
+        return
+    from pygameframe import PyGameFrame, PyGameSubsurfaceFrame
+
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+    image = pygame.image.load(MEDIA).convert_alpha()
+    canvas = pygame.Surface((800, 600))
+
+    for FrameType in (PyGameFrame, PyGameSubsurfaceFrame):
+        grid = Grid(FrameType, 32, 32, 1024, 768, 3, 3, 1)
+        animations = [Animation(grid('1-8', i % 5 + 1), 0.1)
+                      for i in range(count)]
+
+        def run():
+            for i, animation in enumerate(animations):
+                animation.draw(canvas, image, i % 768, i % 568)
+
+        elapsed = measure(run)
+        results['draw/{0}'.format(FrameType.__name__)] = {
+            'seconds': elapsed, 'ops_per_second': count / elapsed}
+
+    pygame.display.quit()
+
+
+def bench_grid(results, count=1000):
+    specs = [('1-8', 1), (18, '8-11', 18, '10-7'), ('7-1', 1, '2-7', 1)]
+
+    def cold():
+        for _ in range(count):
+            grid = Grid(StubFrame, 32, 32, 1024, 768, 3, 3, 1)
+            for spec in specs:
+                grid.get_frames(*spec)
+
+    grid = Grid(StubFrame, 32, 32, 1024, 768, 3, 3, 1)
+
+    def warm():
+        for _ in range(count):
+            for spec in specs:
+                grid.get_frames(*spec)
+
+    for name, function in (('cold', cold), ('warm', warm)):
+        elapsed = measure(function)
+        results['get_frames/{0}'.format(name)] = {
+            'seconds': elapsed,
+            'ops_per_second': count * len(specs) / elapsed}
+
+
+def bench_memory(results, count=10000):
+    grid = Grid(StubFrame, 1, 1, 1024, 1024)
+    frames = grid.get_frames('1-8', 1)
+
+    gc.collect()
+    tracemalloc.start()
+    animations = [Animation(frames, 0.1) for _ in range(count)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del animations
+
+    results['memory/animation'] = {'bytes': size / count}
+
+
+def run(quick=False):
+    counts = (100, 1000) if quick else (100, 1000, 10000)
+    frame_counts = (8, 128)
+
+    results = {}
+    bench_update(results, counts, frame_counts)
+    bench_draw(results)
+    bench_grid(results)
+    bench_memory(results)
+    return {'python': sys.version.split()[0], 'results': results}
+
+
+def compare(baseline, current, threshold):
+    """Print the changes and return the list of the regressions.
+
+    The benchmark has regressed if it takes more seconds (or bytes) than
+    the baseline by more than the threshold percent.
+
+    """
+    regressions = []
+    for name, new in sorted(current['results'].items()):
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        metric = 'seconds' if 'seconds' in new else 'bytes'
+        change = 100.0 * (new[metric] - old[metric]) / old[metric]
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print('{0:40} {1:+8.1f}%{2}'.format(name, change, flag))
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-o', '--output', help='the results JSON file')
+    parser.add_argument('--quick', action='store_true',
+                        help='skip the largest animation counts')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='compare two results files')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='the regression threshold in percent')
+    args = parser.parse_args(argv[1:])
+
+    if args.compare:
+        with open(args.compare[0]) as file_:
+            baseline = json.load(file_)
+        with open(args.compare[1]) as file_:
+            current = json.load(file_)
+        return 1 if compare(baseline, current, args.threshold) else 0
+
+    results = run(args.quick)
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as file_:
+            file_.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""Baked animation bundles.
+
+The bundle keeps the pre-sliced RGBA pixels of the frames and the parsed
+timelines of the named animations in one file. The loader maps the file
+into memory, so the frame pixels are read from the disk only when
+the frame is drawn the first time.
+
+File layout:
+    * 8 bytes: the magic b'ANIM10B1';
+    * 8 bytes: the little-endian length of the header;
+    * the header: UTF-8 JSON with the frame sizes and offsets (and
+      the trimming offsets of the trimmed frames) and the animation tables;
+    * zero padding up to the 16 bytes boundary;
+    * the frame pixels.
+
+"""
+import json
+import mmap
+import struct
+
+import pygame
+
+from anim10 import AnimationTemplate
+from pygameframe import PyGameSubsurfaceFrame, convert_alpha, copy_pixels
+
+MAGIC = b'ANIM10B1'
+
+_LENGTH = struct.Struct('<Q')
+_ALIGNMENT = 16
+
+
+class BundleFrame(PyGameSubsurfaceFrame):
+    """The frame which pixels are stored in the bundle.
+
+    The frame surface is created on the first draw directly over
+    the mapped file, without copying. The image argument of the draw
+    method is ignored.
+
+    """
+    def __init__(self, bundle, offset, width, height,
+                 offset_x=0, offset_y=0, full_width=None, full_height=None):
+        """Initialize the frame object.
+
+        Args:
+            bundle (Bundle): The bundle which keeps the pixels.
+            offset (int): The offset of the pixels in the bundle data.
+            width (int): Frame width.
+            height (int): Frame height.
+            offset_x (int, optional): The left offset of the trimmed frame.
+            offset_y (int, optional): The top offset of the trimmed frame.
+            full_width (int, optional): The width of the frame before
+                trimming. Defaults to the width.
+            full_height (int, optional): The height of the frame before
+                trimming. Defaults to the height.
+
+        """
+        super().__init__(0, 0, width, height, width, height)
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.full_width = width if full_width is None else full_width
+        self.full_height = height if full_height is None else full_height
+
+        self._bundle = bundle
+        self._offset = offset
+
+    def get_blit(self, image, *args, **kwargs):
+        if self.page is None:
+            self.page = self._bundle._get_surface(self._offset,
+                                                  self.width, self.height)
+        return super().get_blit(image, *args, **kwargs)
+
+
+class Bundle:
+    """The memory-mapped animation bundle.
+
+    Attributes:
+        frames (list): The bundle frames.
+        templates (dict): The animation templates by the animation names.
+
+    Examples:
+        bundle = Bundle('assets.bundle')
+        plane = bundle.new_animation('plane')
+        plane.draw(screen, None, 100, 400)
+
+    """
+    def __init__(self, path):
+        """Map the bundle file.
+
+        Args:
+            path (str): The bundle file path.
+
+        """
+        with open(path, 'rb') as file_:
+            self._mmap = mmap.mmap(file_.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError('"{0}" is not an animation bundle'.format(path))
+
+        start = len(MAGIC) + _LENGTH.size
+        length, = _LENGTH.unpack_from(self._mmap, len(MAGIC))
+        header = json.loads(self._mmap[start:start + length].decode('utf-8'))
+
+        self._data = memoryview(self._mmap)[_align(start + length):]
+
+        self.frames = [BundleFrame(self, *entry) for entry in header['frames']]
+        self.templates = {}
+        for name, table in header['animations'].items():
+            self.templates[name] = AnimationTemplate.from_tables(
+                [self.frames[i] for i in table['frames']],
+                table['durations'], table['intervals'], table['total'])
+
+    def new_animation(self, name, on_loop=None):
+        """Create the animation by its name.
+
+        Args:
+            name (str): The animation name.
+            on_loop (function, optional): it will be called every time
+                the animation "loops".
+
+        Returns:
+            The new animation object.
+
+        """
+        return self.templates[name].spawn(on_loop)
+
+    def close(self):
+        """Release the mapped file. The frames must not be drawn after."""
+        # The cached variants can refer to the mapped pixels too.
+        BundleFrame.transform_cache.discard(self.frames)
+        for frame in self.frames:
+            frame.page = frame.image = frame.quad = None
+        self._data.release()
+        self._mmap.close()
+
+    def _get_surface(self, offset, width, height):
+        """Create the surface over the frame pixels."""
+        size = width * height * 4
+        return pygame.image.frombuffer(self._data[offset:offset + size],
+                                       (width, height), 'RGBA')
+
+
+def bake_bundle(path, animations):
+    """Write the animations to the bundle file.
+
+    Args:
+        path (str): The bundle file path.
+        animations (dict): The (animation, image) tuples by the animation
+            names. The animation can be an Animation or
+            an AnimationTemplate, its frames must be drawable from the image
+            with the get_viewport region. The frames shared by several
+            animations are stored once.
+
+    Examples:
+        bake_bundle('assets.bundle', {
+            'plane': (new_animation(g64(1, '1-3'), 0.1), image),
+            'witch-down': (Animation(grid('1-3', 1, 2, 1), 0.15), witch),
+        })
+
+    The colorkeyed images are baked with the colorkey pixels transparent,
+    so the bundle frames are drawn the same way as the source ones:
+
+    >>> import os, tempfile
+    >>> from anim10 import Animation, Grid
+    >>> image = pygame.image.load('media/1945.png')
+    >>> image.get_colorkey()
+    (2, 73, 148, 255)
+    >>> grid = Grid(PyGameSubsurfaceFrame, 32, 32, 1024, 768, 3, 3, 1)
+    >>> spin = Animation(grid('1-8', 1), 0.1)
+    >>> directory = tempfile.TemporaryDirectory()
+    >>> path = os.path.join(directory.name, 'spin.bundle')
+    >>> bake_bundle(path, {'spin': (spin, image)})
+    >>> bundle = Bundle(path)
+    >>> baked = bundle.new_animation('spin')
+    >>> def render(animation, image, position):
+    ...     canvas = pygame.Surface((32, 32))
+    ...     canvas.fill((255, 255, 255))
+    ...     animation.goto_frame(position)
+    ...     animation.draw(canvas, image, 0, 0)
+    ...     return pygame.image.tobytes(canvas, 'RGB')
+    >>> all(render(baked, None, i) == render(spin, image, i)
+    ...     for i in range(len(spin.frames)))
+    True
+    >>> bundle.close()
+    >>> directory.cleanup()
+
+    """
+    frames, indices, pixels = [], {}, []
+    offset = 0
+    tables = {}
+    images = {}
+
+    for name, (animation, image) in animations.items():
+        if id(image) not in images:
+            images[id(image)] = convert_alpha(image)
+        image = images[id(image)]
+        frame_indices = []
+        for frame in animation.frames:
+            if id(frame) not in indices:
+                indices[id(frame)] = len(frames)
+                data = _get_pixels(frame, image)
+                entry = offset, frame.width, frame.height
+                if (frame.width, frame.height) != (frame.full_width,
+                                                   frame.full_height):
+                    entry += (frame.offset_x, frame.offset_y,
+                              frame.full_width, frame.full_height)
+                frames.append(entry)
+                pixels.append(data)
+                offset += len(data)
+            frame_indices.append(indices[id(frame)])
+
+        tables[name] = {
+            'frames': frame_indices,
+            'durations': list(animation.durations.items()),
+            'intervals': list(animation.intervals),
+            'total': animation.total_duration,
+        }
+
+    header = json.dumps({'frames': frames, 'animations': tables},
+                        separators=(',', ':')).encode('utf-8')
+    start = len(MAGIC) + _LENGTH.size + len(header)
+
+    with open(path, 'wb') as file_:
+        file_.write(MAGIC)
+        file_.write(_LENGTH.pack(len(header)))
+        file_.write(header)
+        file_.write(bytes(_align(start) - start))
+        for data in pixels:
+            file_.write(data)
+
+
+def _get_pixels(frame, image):
+    """Return the RGBA pixels of the frame region of the image."""
+    surface = pygame.Surface((frame.width, frame.height), pygame.SRCALPHA, 32)
+    copy_pixels(surface, getattr(frame, 'page', None) or image, (0, 0),
+                frame.get_viewport())
+    return pygame.image.tobytes(surface, 'RGBA')
+
+
+def _align(offset):
+    """Round the offset up to the alignment."""
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
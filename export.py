@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Offline export of the manifest animations.
+
+Each animation is stepped through one loop with the fixed FPS and rendered
+off-screen to:
+    * a sequence of PNG frames (name/0000.png, name/0001.png, ...);
+    * a contact sheet strip (name.png);
+    * an animated GIF (name.gif). It requires Pillow.
+
+The animations are exported in parallel by a process pool.
+
+Usage:
+    python export.py animations.json -o previews --fps 30
+
+"""
+import argparse
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+FORMATS = ('frames', 'strip', 'gif')
+
+# The manifest and the decoded images of the worker process.
+_worker = {}
+
+
+def export_animations(manifest_path, output_dir, names=None, fps=30,
+                      formats=FORMATS, columns=10, max_workers=None):
+    """Export the manifest animations.
+
+    Args:
+        manifest_path (str): The manifest file path. Its grids must have
+            the "image" field.
+        output_dir (str): The output directory.
+        names (list, optional): The names of the animations to export.
+            Defaults to all the animations.
+        fps (int, optional): The output frame rate. Defaults to 30.
+        formats (list, optional): The output formats. Defaults to all of
+            "frames", "strip" and "gif".
+        columns (int, optional): The number of the frames in one row of
+            the strip. Defaults to 10.
+        max_workers (int, optional): The number of the processes.
+            Defaults to the number of the CPUs.
+
+    Returns:
+        A dictionary of the written file paths by the animation names.
+
+    """
+    if names is None:
+        names = _load(manifest_path).templates.keys()
+
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [(name, output_dir, fps, tuple(formats), columns)
+            for name in names]
+
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker,
+                             initargs=(manifest_path,)) as executor:
+        return dict(zip(names, executor.map(_export_animation, *zip(*jobs))))
+
+
+def render_animation(animation, image, fps):
+    """Render one loop of the animation.
+
+    Args:
+        animation (Animation): The animation to render. It is updated.
+        image (pygame.Surface): The image where all the frames are.
+            The colorkey pixels are rendered transparent.
+        fps (int): The output frame rate.
+
+    Returns:
+        The list of the rendered pygame.Surface objects.
+
+    """
+    import pygame
+    from pygameframe import convert_alpha, copy_pixels
+
+    image = convert_alpha(image)
+
+    width = max(frame.full_width for frame in animation.frames)
+    height = max(frame.full_height for frame in animation.frames)
+    count = max(1, math.ceil(animation.total_duration * fps))
+
+    result = []
+    for _ in range(count):
+        frame = animation.get_frame_info()
+        kwargs = {}
+        if frame.transformable:
+            kwargs = {'flip_h': animation.flipped_h,
+                      'flip_v': animation.flipped_v}
+        source, area, dx, dy = frame.get_blit(image, **kwargs)
+
+        surface = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+        copy_pixels(surface, source, (dx, dy), area)
+        result.append(surface)
+
+        animation.update(1 / fps)
+    return result
+
+
+def _init_worker(manifest_path):
+    """Load the manifest once per worker process."""
+    _worker['manifest'] = _load(manifest_path)
+    _worker['images'] = {}
+
+
+def _get_image(path):
+    """Return the decoded image, it is loaded once per worker process."""
+    import pygame
+    from pygameframe import convert_alpha
+
+    images = _worker['images']
+    if path not in images:
+        images[path] = convert_alpha(pygame.image.load(path))
+    return images[path]
+
+
+def _export_animation(name, output_dir, fps, formats, columns):
+    """Export one animation. Runs in the process pool."""
+    import pygame
+
+    manifest = _worker['manifest']
+    image = _get_image(manifest.images[manifest.animation_grids[name]])
+    frames = render_animation(manifest.new_animation(name), image, fps)
+
+    paths = []
+    if 'frames' in formats:
+        directory = os.path.join(output_dir, name)
+        os.makedirs(directory, exist_ok=True)
+        for i, frame in enumerate(frames):
+            paths.append(os.path.join(directory, '{0:04}.png'.format(i)))
+            pygame.image.save(frame, paths[-1])
+
+    if 'strip' in formats:
+        width, height = frames[0].get_size()
+        rows = math.ceil(len(frames) / columns)
+        strip = pygame.Surface((width * min(columns, len(frames)),
+                                height * rows), pygame.SRCALPHA, 32)
+        for i, frame in enumerate(frames):
+            row, column = divmod(i, columns)
+            strip.blit(frame, (column * width, row * height),
+                       special_flags=pygame.BLEND_RGBA_MAX)
+        paths.append(os.path.join(output_dir, name + '.png'))
+        pygame.image.save(strip, paths[-1])
+
+    if 'gif' in formats:
+        paths.append(os.path.join(output_dir, name + '.gif'))
+        _save_gif(frames, fps, paths[-1])
+
+    return paths
+
+
+def _save_gif(frames, fps, path):
+    """Save the frames as the animated GIF."""
+    import pygame
+    try:
+        from PIL import Image
+    except ImportError:
+        raise RuntimeError('The GIF export requires Pillow')
+
+    images = [Image.frombytes('RGBA', frame.get_size(),
+                              pygame.image.tobytes(frame, 'RGBA'))
+              for frame in frames]
+    images[0].save(path, save_all=True, append_images=images[1:],
+                   duration=round(1000 / fps), loop=0, disposal=2)
+
+
+def _load(manifest_path):
+    """Load the manifest in the headless mode."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+    from manifest import load_manifest
+    from pygameframe import PyGameSubsurfaceFrame
+    return load_manifest(manifest_path, PyGameSubsurfaceFrame)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('manifest', help='the animation manifest file')
+    parser.add_argument('names', nargs='*',
+                        help='the animations to export (all by default)')
+    parser.add_argument('-o', '--output', default='export',
+                        help='the output directory')
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--formats', default=','.join(FORMATS),
+                        help='comma separated: ' + ', '.join(FORMATS))
+    parser.add_argument('--columns', type=int, default=10,
+                        help='the number of the frames in the strip row')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='the number of the processes')
+    args = parser.parse_args(argv[1:])
+
+    formats = [name for name in args.formats.split(',') if name]
+    for name in formats:
+        if name not in FORMATS:
+            parser.error('unknown format "{0}"'.format(name))
+
+    results = export_animations(args.manifest, args.output,
+                                args.names or None, args.fps, formats,
+                                args.columns, args.jobs)
+    for name, paths in results.items():
+        print('{0}: {1} files'.format(name, len(paths)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from collections import deque
 import time
 import pygame
 
@@ -13,15 +14,146 @@ def process_events():
     return False
 
 
-def get_delta_time():
-    if not hasattr(get_delta_time, 'timestamp'):
-        setattr(get_delta_time, 'timestamp', time.time())
+class Clock:
+    """The monotonic high-resolution frame clock.
+
+    The clock measures the time between two tick calls. With the target FPS
+    it also waits for the next frame: it sleeps while there is enough time
+    and spins for the last spin_threshold seconds, because the sleep is not
+    precise. The clock starts on the first tick call, which returns zero.
+    The clocks are independent, so you can keep, for example, a paused game
+    clock and a running UI clock.
+
+    Attributes:
+        fps (number): The target frame rate or None to not wait.
+        max_dt (number): The maximal dt, longer hitches are clamped to it,
+            or None to not clamp.
+        smoothing (number): The dt smoothing factor from 0 (no smoothing)
+            to 1 (exclusive).
+        spin_threshold (number): The time before the frame deadline
+            in seconds, which is spent spinning instead of sleeping.
+        paused (bool): The paused clock returns zero dt.
+
+    Examples:
+        clock = Clock(fps=60)
+        while not terminated:
+            dt = clock.tick()
+
+    """
+    def __init__(self, fps=None, max_dt=0.25, smoothing=0,
+                 spin_threshold=0.002, samples=600):
+        """Initialize the clock object.
+
+        Args:
+            fps (number, optional): The target frame rate. Defaults to None,
+                the clock does not wait.
+            max_dt (number, optional): The maximal dt or None.
+                Defaults to 0.25.
+            smoothing (number, optional): The dt smoothing factor.
+                Defaults to 0.
+            spin_threshold (number, optional): The spinning time in seconds.
+                Defaults to 0.002.
+            samples (int, optional): The number of the last frame times
+                kept for the statistics. Defaults to 600.
+
+        """
+        self.fps = fps
+        self.max_dt = max_dt
+        self.smoothing = smoothing
+        self.spin_threshold = spin_threshold
+        self.paused = False
+
+        self._timestamp = None
+        self._deadline = None
+        self._dt = None
+        self._frame_times = deque(maxlen=samples)
+        self._frames = 0
+        self._dropped = 0
+
+    def tick(self):
+        """Wait for the next frame, if the target FPS is set,
+        and return the time passed since the previous tick.
+
+        Returns:
+            The clamped and smoothed dt in seconds, zero if paused.
+
+        """
+        now = time.perf_counter_ns()
+        if self._timestamp is None:
+            # The time before the first tick is not a frame.
+            self._timestamp = self._deadline = now
+            return 0.0
+
+        if self.fps:
+            period = round(1e9 / self.fps)
+            self._deadline += period
+            if now > self._deadline:
+                # Do not try to catch up the missed frames.
+                self._dropped += (now - self._deadline) // period
+                self._deadline = now
+            else:
+                now = self._wait(self._deadline)
 
-    timestamp = getattr(get_delta_time, 'timestamp')
+        elapsed = now - self._timestamp
+        self._timestamp = now
+        self._frame_times.append(elapsed)
+        self._frames += 1
 
-    current_timestamp = time.time()
-    dt = current_timestamp - timestamp
+        dt = elapsed / 1e9
+        if self.max_dt is not None:
+            dt = min(dt, self.max_dt)
+        if self.smoothing and self._dt is not None:
+            dt = self._dt + (dt - self._dt) * (1 - self.smoothing)
+        self._dt = dt
 
-    setattr(get_delta_time, 'timestamp', current_timestamp)
+        return 0.0 if self.paused else dt
 
-    return dt
+    def pause(self):
+        """Make the tick method return zero dt."""
+        self.paused = True
+
+    def resume(self):
+        """Make the tick method return the real dt again."""
+        self.paused = False
+
+    def get_stats(self):
+        """Return the frame time statistics.
+
+        Returns:
+            The dictionary with the number of the frames, the number of
+            the dropped frames (missed target frame deadlines) and
+            the mean and the 99th percentile of the last frame times
+            in seconds.
+
+        """
+        frame_times = sorted(self._frame_times)
+        count = len(frame_times)
+        return {
+            'frames': self._frames,
+            'dropped': self._dropped,
+            'mean': sum(frame_times) / count / 1e9 if count else 0.0,
+            'p99': frame_times[min(count - 1, count * 99 // 100)] / 1e9
+            if count else 0.0,
+        }
+
+    def _wait(self, deadline):
+        """Sleep and then spin until the deadline."""
+        remaining = (deadline - time.perf_counter_ns()) / 1e9
+        if remaining > self.spin_threshold:
+            time.sleep(remaining - self.spin_threshold)
+
+        now = time.perf_counter_ns()
+        while now < deadline:
+            now = time.perf_counter_ns()
+        return now
+
+
+_default_clock = None
+
+
+def get_delta_time():
+    """Return the time passed since the previous call."""
+    global _default_clock
+    if _default_clock is None:
+        _default_clock = Clock(max_dt=None)
+    return _default_clock.tick()
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""Optional instrumentation of the anim10 hot paths.
+
+The instrumented methods are swapped in by the enable function and
+the original ones are restored by the disable function, so there is no
+cost at all while the instrumentation is disabled.
+
+Each class has its own probe, for example, "Animation.update" and
+"TickAnimation.update". Only the outermost call of the method is
+measured, so the overloaded methods which call the base one are
+counted once.
+
+Examples:
+    import instrumentation
+
+    with instrumentation.sampling() as stats:
+        run_scene()
+    print(stats['Animation.update']['p99'])
+
+"""
+from collections import deque
+from contextlib import contextmanager
+import functools
+import sys
+import time
+
+from anim10 import Animation, Frame, Grid
+
+SAMPLES = 10000
+
+_PATCHES = (
+    (Animation, 'update'),
+    (Animation, 'draw'),
+    (Animation, '_seek_frame_index'),
+    (Frame, 'draw'),
+    (Grid, 'get_frames'),
+)
+
+_probes = {}
+_originals = []
+# The instrumented methods being called now, by the base classes and
+# the method names.
+_active = set()
+_counters = {'frame_changes': 0, 'spec_hits': 0, 'spec_misses': 0}
+
+
+class _Probe:
+    """Keeps the calls count and the timings of one method."""
+    def __init__(self):
+        self.samples = deque(maxlen=SAMPLES)
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.total = 0
+        self.samples.clear()
+
+    def add(self, elapsed):
+        self.calls += 1
+        self.total += elapsed
+        self.samples.append(elapsed)
+
+    def snapshot(self):
+        samples = sorted(self.samples)
+        result = {
+            'calls': self.calls,
+            'total': self.total / 1e9,
+            'mean': self.total / self.calls / 1e9 if self.calls else 0.0,
+        }
+        for percentile in (50, 90, 99):
+            if samples:
+                index = min(len(samples) - 1,
+                            len(samples) * percentile // 100)
+                result['p{0}'.format(percentile)] = samples[index] / 1e9
+            else:
+                result['p{0}'.format(percentile)] = 0.0
+        return result
+
+
+def is_enabled():
+    """Whether the instrumented methods are installed."""
+    return bool(_originals)
+
+
+def enable():
+    """Install the instrumented methods. The Frame and Animation subclasses
+    must be defined before, the later ones are not instrumented."""
+    if _originals:
+        return
+
+    for base, name in _PATCHES:
+        for cls in [base] + _get_subclasses(base):
+            if name not in cls.__dict__:
+                continue
+            probe = _probes.setdefault('{0}.{1}'.format(cls.__name__, name),
+                                       _Probe())
+            original = cls.__dict__[name]
+            _originals.append((cls, name, original))
+            setattr(cls, name,
+                    _instrument(original, (base, name), probe))
+
+
+def disable():
+    """Restore the original methods. The collected data is kept."""
+    while _originals:
+        cls, name, original = _originals.pop()
+        setattr(cls, name, original)
+
+
+def reset():
+    """Drop the collected data."""
+    for probe in _probes.values():
+        probe.reset()
+    for key in _counters:
+        _counters[key] = 0
+
+    transform_cache = _get_transform_cache()
+    if transform_cache is not None:
+        transform_cache.hits = transform_cache.misses = 0
+
+
+def snapshot():
+    """Return the collected data.
+
+    Returns:
+        The dictionary with:
+            * the calls count, the total and the mean time and
+              the 50th, 90th and 99th percentiles (in seconds) by the method
+              names;
+            * 'frame_changes': the number of updates (of all the animation
+              classes) which changed the animation frame and
+              'frame_change_rate': the share of such updates;
+            * 'caches': the hits, the misses and the hit rate of the grid
+              frame specs and the pygame transform cache (if it is used).
+
+    """
+    result = {name: probe.snapshot() for name, probe in _probes.items()}
+
+    updates = sum(probe.calls for name, probe in _probes.items()
+                  if name.endswith('.update'))
+    result['frame_changes'] = _counters['frame_changes']
+    result['frame_change_rate'] = (
+        _counters['frame_changes'] / updates if updates else 0.0)
+
+    caches = {'grid_specs': _get_cache_stats(_counters['spec_hits'],
+                                             _counters['spec_misses'])}
+    transform_cache = _get_transform_cache()
+    if transform_cache is not None:
+        caches['transforms'] = _get_cache_stats(transform_cache.hits,
+                                                transform_cache.misses)
+    result['caches'] = caches
+
+    return result
+
+
+@contextmanager
+def sampling():
+    """Collect the data of the block only.
+
+    Yields:
+        The dictionary, which is filled with the snapshot when
+        the block ends.
+
+    """
+    was_enabled = is_enabled()
+    reset()
+    enable()
+    stats = {}
+    try:
+        yield stats
+    finally:
+        stats.update(snapshot())
+        if not was_enabled:
+            disable()
+
+
+def _instrument(original, key, probe):
+    """Wrap the method to measure its outermost calls."""
+    clock = time.perf_counter_ns
+    name = key[1]
+
+    if isinstance(original, staticmethod):
+        function = original.__func__
+
+        @functools.wraps(function)
+        def static_wrapper(*args, **kwargs):
+            if key in _active:
+                return function(*args, **kwargs)
+            _active.add(key)
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                probe.add(clock() - start)
+                _active.discard(key)
+        return staticmethod(static_wrapper)
+
+    if name == 'update':
+        @functools.wraps(original)
+        def update_wrapper(self, *args, **kwargs):
+            if key in _active:
+                return original(self, *args, **kwargs)
+            _active.add(key)
+            position = self.position
+            start = clock()
+            try:
+                return original(self, *args, **kwargs)
+            finally:
+                probe.add(clock() - start)
+                _active.discard(key)
+                if self.position != position:
+                    _counters['frame_changes'] += 1
+        return update_wrapper
+
+    if name == 'get_frames':
+        @functools.wraps(original)
+        def get_frames_wrapper(self, *args, **kwargs):
+            if key in _active:
+                return original(self, *args, **kwargs)
+            _active.add(key)
+            _counters['spec_hits' if args in self._specs
+                      else 'spec_misses'] += 1
+            start = clock()
+            try:
+                return original(self, *args, **kwargs)
+            finally:
+                probe.add(clock() - start)
+                _active.discard(key)
+        return get_frames_wrapper
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        if key in _active:
+            return original(*args, **kwargs)
+        _active.add(key)
+        start = clock()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            probe.add(clock() - start)
+            _active.discard(key)
+    return wrapper
+
+
+def _get_subclasses(cls):
+    """Return all the subclasses of the class recursively."""
+    result = []
+    for subclass in cls.__subclasses__():
+        result.append(subclass)
+        result.extend(_get_subclasses(subclass))
+    return result
+
+
+def _get_transform_cache():
+    """Return the pygame transform cache, if pygameframe is imported."""
+    pygameframe = sys.modules.get('pygameframe')
+    if pygameframe is None:
+        return None
+    return pygameframe.PyGameSubsurfaceFrame.transform_cache
+
+
+def _get_cache_stats(hits, misses):
+    """Return the cache statistics dictionary."""
+    total = hits + misses
+    return {'hits': hits, 'misses': misses,
+            'hit_rate': hits / total if total else 0.0}
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""Declarative animation manifests.
+
+A manifest is a JSON or TOML file which describes the grids and
+the animations:
+
+    {
+        "grids": {
+            "g32": {"image": "media/1945.png",
+                    "frame_width": 32, "frame_height": 32,
+                    "image_width": 1024, "image_height": 768,
+                    "left": 3, "top": 3, "border": 1}
+        },
+        "animations": {
+            "spin": {"grid": "g32", "frames": [18, "8-11", 18, "10-7"],
+                     "durations": 0.2},
+            "explosion": {"grid": "g32", "frames": ["1-8", 5],
+                          "durations": {"1": 0.1, "2-8": 0.05},
+                          "on_loop": "pause_at_end"}
+        }
+    }
+
+The optional grid "image" is the image path relative to the manifest.
+The "on_loop" value is the name of the Animation method which is called
+every time the animation loops: "pause", "pause_at_start" or
+"pause_at_end".
+
+The compiled manifest (the frame cell indices and the interval tables) is
+cached in the cache directory by the hash of the manifest content, so
+the next loads do not parse anything.
+
+"""
+import hashlib
+import json
+import os
+
+from anim10 import AnimationTemplate, Grid, LoopMethod
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+CACHE_VERSION = 3
+
+_GRID_FIELDS = ('frame_width', 'frame_height', 'image_width', 'image_height',
+                'left', 'top', 'border')
+_ON_LOOP_METHODS = ('pause', 'pause_at_start', 'pause_at_end')
+
+
+class Manifest:
+    """The loaded animation manifest.
+
+    Attributes:
+        grids (dict): The grids by the names.
+        images (dict): The image paths by the grid names. Only the grids
+            with the image are listed.
+        templates (dict): The animation templates by the names.
+        animation_grids (dict): The grid names by the animation names.
+
+    Examples:
+        manifest = load_manifest('animations.json', PyGameSubsurfaceFrame)
+        spin = manifest.new_animation('spin')
+
+    """
+    def __init__(self, FrameType, compiled, root=''):
+        """Build the grids and the templates from the compiled manifest.
+
+        Args:
+            FrameType (class): Derived class from the Frame
+                with overloaded methods.
+            compiled (dict): The compiled manifest.
+            root (str, optional): The directory the image paths are
+                relative to.
+
+        """
+        self.grids = {name: Grid(FrameType, *args)
+                      for name, args in compiled['grids'].items()}
+        self.images = {name: os.path.join(root, path)
+                       for name, path in compiled['images'].items()}
+        self.templates = {}
+        self.animation_grids = {}
+        self._on_loop = {}
+
+        for name, table in compiled['animations'].items():
+            self.animation_grids[name] = table['grid']
+            frames = self.grids[table['grid']].get_cells(table['cells'])
+            self.templates[name] = AnimationTemplate.from_tables(
+                frames, table['durations'], table['intervals'], table['total'])
+            if table['on_loop'] is not None:
+                self._on_loop[name] = table['on_loop']
+
+    def new_animation(self, name):
+        """Create the animation by its name.
+
+        Args:
+            name (str): The animation name.
+
+        Returns:
+            The new animation object.
+
+        """
+        method = self._on_loop.get(name)
+        return self.templates[name].spawn(
+            None if method is None else LoopMethod(method))
+
+
+def load_manifest(path, FrameType, cache_dir=None):
+    """Load the manifest, using the compiled cache when it is possible.
+
+    Args:
+        path (str): The manifest file path. The files with the .toml
+            extension are parsed as TOML, the others as JSON.
+        FrameType (class): Derived class from the Frame
+            with overloaded methods.
+        cache_dir (str, optional): The directory of the compiled manifests.
+            Defaults to the .anim10-cache directory next to the manifest.
+            Pass False to disable the cache.
+
+    Returns:
+        The Manifest object.
+
+    """
+    with open(path, 'rb') as file_:
+        content = file_.read()
+    root = os.path.dirname(path)
+
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)),
+                                 '.anim10-cache')
+
+    cache_path = None
+    if cache_dir is not False:
+        digest = hashlib.sha256(content).hexdigest()
+        cache_path = os.path.join(
+            cache_dir, '{0}-{1}.json'.format(digest, CACHE_VERSION))
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as file_:
+                return Manifest(FrameType, json.load(file_), root)
+        except (OSError, ValueError, KeyError):
+            pass
+
+    if path.endswith('.toml'):
+        if tomllib is None:
+            raise RuntimeError('TOML manifests require python 3.11+')
+        manifest = tomllib.loads(content.decode('utf-8'))
+    else:
+        manifest = json.loads(content.decode('utf-8'))
+
+    compiled = compile_manifest(manifest)
+
+    if cache_path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_path = '{0}.{1}.tmp'.format(cache_path, os.getpid())
+            with open(temp_path, 'w', encoding='utf-8') as file_:
+                json.dump(compiled, file_, separators=(',', ':'))
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass
+
+    return Manifest(FrameType, compiled, root)
+
+
+def compile_manifest(manifest):
+    """Resolve the frame specs and parse the durations of the manifest.
+
+    Args:
+        manifest (dict): The parsed manifest file.
+
+    Returns:
+        The compiled manifest, which can be stored as JSON.
+
+    """
+    grids, compiled_grids, images = {}, {}, {}
+    for name, description in manifest.get('grids', {}).items():
+        args = [description[field] for field in _GRID_FIELDS[:4]]
+        args += [description.get(field, 0) for field in _GRID_FIELDS[4:]]
+        grids[name] = Grid(None, *args)
+        compiled_grids[name] = args
+        if 'image' in description:
+            images[name] = description['image']
+
+    animations = {}
+    for name, description in manifest.get('animations', {}).items():
+        on_loop = description.get('on_loop')
+        if on_loop is not None and on_loop not in _ON_LOOP_METHODS:
+            raise ValueError('Unknown on_loop "{0}" of the "{1}" animation'
+                             .format(on_loop, name))
+
+        cells = grids[description['grid']].compile_spec(
+            *description['frames'])
+        template = AnimationTemplate(
+            cells, _parse_json_durations(description['durations']))
+
+        animations[name] = {
+            'grid': description['grid'],
+            'cells': list(cells),
+            'durations': list(template.durations.items()),
+            'intervals': list(template.intervals),
+            'total': template.total_duration,
+            'on_loop': on_loop,
+        }
+
+    return {'grids': compiled_grids, 'images': images,
+            'animations': animations}
+
+
+def _parse_json_durations(durations):
+    """Convert the single frame keys like "3" to the numbers,
+    because JSON and TOML keys are always strings."""
+    if not isinstance(durations, dict):
+        return durations
+    return {int(key) if key.strip().isdigit() else key: duration
+            for key, duration in durations.items()}
@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""The NumPy frame backend for the headless rendering.
+
+The images are (height, width, channels) arrays. The frames are views
+into the image array, so slicing the sheet never copies the pixels, and
+the frames are drawn by compositing them into the destination array.
+The last channel of the 4 channel arrays is the straight (not
+premultiplied) alpha.
+
+The integer arrays use the full range of their type as the alpha range
+(255 for uint8), the float arrays use the range from 0 to 1.
+
+Requires numpy.
+
+Examples:
+    image = np.asarray(PIL.Image.open('media/1945.png').convert('RGBA'))
+    grid = Grid(NumpyFrame, 32, 32, 1024, 768, 3, 3, 1)
+    spin = Animation(grid('1-8', 1), 0.1)
+
+    canvas = np.zeros((600, 800, 3), dtype=np.uint8)
+    spin.draw(canvas, image, 100, 100)
+
+"""
+import math
+
+import numpy as np
+
+from anim10 import Frame
+
+
+class NumpyFrame(Frame):
+    """The frame which is the view into the image array.
+
+    The frame binds to the image on the first draw and keeps the view of
+    its viewport in the quad attribute. When another image is passed,
+    the frame rebinds.
+
+    Attributes:
+        image (numpy.ndarray): The image the frame is bound to.
+
+    """
+    transformable = True
+
+    def create_frame(self, width, height):
+        self.image = None
+        return None
+
+    def draw(self, canvas, image, x, y, flip_h=False, flip_v=False):
+        """Composite the frame into the canvas array.
+
+        Args:
+            canvas (numpy.ndarray): The (height, width, channels) array
+                to draw on.
+            image (numpy.ndarray): The image where all the frames are.
+            x (number): The left coordinate of the frame on the canvas.
+            y (number): The top coordinate of the frame on the canvas.
+            flip_h (bool, optional): Flip the frame horizontally.
+            flip_v (bool, optional): Flip the frame vertically.
+
+        """
+        source, _, dx, dy = self.get_blit(image, flip_h, flip_v)
+        composite(canvas, source, x + dx, y + dy)
+
+    def get_blit(self, image, flip_h=False, flip_v=False):
+        if image is not self.image:
+            self.bind(image)
+
+        source = self.quad
+        if flip_h:
+            source = source[:, ::-1]
+        if flip_v:
+            source = source[::-1]
+        return (source, None) + self.get_offset(flip_h, flip_v)
+
+    def bind(self, image):
+        """Create the view of the frame viewport.
+
+        Args:
+            image (numpy.ndarray): The image where all the frames are.
+
+        Raises:
+            ValueError: If the frame does not fit into the image.
+
+        """
+        if (self.y + self.height > image.shape[0] or
+                self.x + self.width > image.shape[1]):
+            raise ValueError('The frame {0} is out of the {1} image'.format(
+                self.get_viewport(), image.shape[:2]))
+
+        self.image = image
+        self.quad = image[self.y:self.y + self.height,
+                          self.x:self.x + self.width]
+
+
+def get_cell_views(grid, image):
+    """Return the read-only view of all the grid cells at once.
+    The pixels are not copied, so the cells can be sampled with the fancy
+    indexing, for example, for the composite_batch sources.
+
+    Only the cells which fit into the image are included.
+
+    Args:
+        grid (Grid): The grid of the image.
+        image (numpy.ndarray): The (height, width, channels) image array.
+
+    Returns:
+        The (rows, columns, frame_height, frame_width, channels) array.
+        The cell (column x, row y) starting from 1 is result[y - 1, x - 1].
+
+    """
+    step_x = grid.frame_width + grid.border
+    step_y = grid.frame_height + grid.border
+    left = grid.left + grid.border
+    top = grid.top + grid.border
+
+    columns = min(grid.width, _count_cells(image.shape[1], left,
+                                           grid.frame_width, step_x))
+    rows = min(grid.height, _count_cells(image.shape[0], top,
+                                         grid.frame_height, step_y))
+
+    origin = image[top:, left:]
+    shape = (rows, columns, grid.frame_height, grid.frame_width) + \
+        image.shape[2:]
+    strides = (origin.strides[0] * step_y, origin.strides[1] * step_x) + \
+        origin.strides
+    return np.lib.stride_tricks.as_strided(origin, shape, strides,
+                                           writeable=False)
+
+
+def trim_grid(grid, alpha, threshold=0):
+    """Trim the transparent borders of all the grid frames.
+    The alpha of all the cells is scanned at once. The frames are drawn
+    at the same positions, but only their opaque regions are drawn.
+    The fully transparent frames become empty.
+
+    Args:
+        grid (Grid): The grid to trim. The missing frames which fit
+            into the image are created.
+        alpha (numpy.ndarray): The (height, width) alpha channel of
+            the image, for example, image[..., 3].
+        threshold (int, optional): The pixels with the alpha up to
+            the threshold are transparent. Defaults to 0.
+
+    Returns:
+        The grid.
+
+    """
+    opaque = get_cell_views(grid, alpha[..., np.newaxis])[..., 0] > threshold
+    rows, columns = opaque.shape[:2]
+    opaque_columns = opaque.any(axis=2)
+    opaque_rows = opaque.any(axis=3)
+
+    lefts = opaque_columns.argmax(axis=2)
+    rights = grid.frame_width - opaque_columns[..., ::-1].argmax(axis=2)
+    tops = opaque_rows.argmax(axis=2)
+    bottoms = grid.frame_height - opaque_rows[..., ::-1].argmax(axis=2)
+    empty = ~opaque_columns.any(axis=2)
+    for bounds in (lefts, rights, tops, bottoms):
+        bounds[empty] = 0
+
+    indices = [y * grid.width + x
+               for y in range(rows) for x in range(columns)]
+    for index, frame in zip(indices, grid.get_cells(indices)):
+        y, x = divmod(index, grid.width)
+        # The frame can be trimmed already, so the region is moved to
+        # the current frame coordinates.
+        frame.trim(int(lefts[y, x]) - frame.offset_x,
+                   int(tops[y, x]) - frame.offset_y,
+                   int(rights[y, x] - lefts[y, x]),
+                   int(bottoms[y, x] - tops[y, x]))
+    return grid
+
+
+def detect_frames(FrameType, alpha, threshold=0):
+    """Find the frames of the irregular sheet by its transparent gaps.
+    The sheet is split into the rows by the fully transparent lines, then
+    each row is split into the frames by the fully transparent columns.
+
+    Args:
+        FrameType (class): Derived class from the Frame
+            with overloaded methods.
+        alpha (numpy.ndarray): The (height, width) alpha channel of
+            the image.
+        threshold (int, optional): The pixels with the alpha up to
+            the threshold are transparent. Defaults to 0.
+
+    Returns:
+        The list of the tight frames from the left to the right and from
+        the top to the bottom.
+
+    Examples:
+        >>> alpha = np.zeros((4, 6), dtype=np.uint8)
+        >>> alpha[1:3, 0:2] = 255
+        >>> alpha[0, 4] = 255
+        >>> frames = detect_frames(NumpyFrame, alpha)
+        >>> [frame.get_viewport() for frame in frames]
+        [(0, 1, 2, 2), (4, 0, 1, 1)]
+
+    """
+    opaque = alpha > threshold
+    height, width = opaque.shape
+
+    frames = []
+    for top, bottom in _get_runs(opaque.any(axis=1)):
+        strip = opaque[top:bottom]
+        for left, right in _get_runs(strip.any(axis=0)):
+            runs = _get_runs(strip[:, left:right].any(axis=1))
+            frame_top, frame_bottom = top + runs[0][0], top + runs[-1][1]
+            frames.append(FrameType(left, frame_top, right - left,
+                                    frame_bottom - frame_top, width, height))
+    return frames
+
+
+def composite(destination, source, x, y):
+    """Composite the source over the destination at the given position.
+    The source is clipped by the destination bounds.
+
+    The 4 (or 2) channel source has the alpha channel, the source without
+    it is copied as is. If the destination has the alpha channel too,
+    the resulting alpha is the "over" of the source and the destination
+    alpha.
+
+    Args:
+        destination (numpy.ndarray): The (height, width, channels) array.
+            It is changed in place.
+        source (numpy.ndarray): The (height, width, channels) array with
+            the same color channels as the destination.
+        x (number): The left coordinate of the source in the destination.
+        y (number): The top coordinate of the source in the destination.
+
+    Examples:
+        >>> canvas = np.zeros((2, 3, 3), dtype=np.uint8)
+        >>> sprite = np.array([[[255, 255, 255, 255], [255, 0, 0, 128]]],
+        ...                   dtype=np.uint8)
+        >>> composite(canvas, sprite, 1, 1)
+        >>> canvas[1].tolist()
+        [[0, 0, 0], [255, 255, 255], [128, 0, 0]]
+
+    """
+    x, y = math.floor(x), math.floor(y)
+    height, width = source.shape[:2]
+
+    left, top = max(x, 0), max(y, 0)
+    right = min(x + width, destination.shape[1])
+    bottom = min(y + height, destination.shape[0])
+    if left >= right or top >= bottom:
+        return
+
+    _blend(destination[top:bottom, left:right],
+           source[top - y:bottom - y, left - x:right - x])
+
+
+def composite_batch(destinations, sources, xs, ys):
+    """Composite one source into each destination at once. It is
+    the vectorized version of the composite function for the generation of
+    the sprite samples.
+
+    Args:
+        destinations (numpy.ndarray): The (count, height, width, channels)
+            array. It is changed in place.
+        sources (numpy.ndarray): The (count, frame_height, frame_width,
+            channels) array of the sources of the same size.
+        xs (list): The left coordinates of the sources.
+        ys (list): The top coordinates of the sources.
+
+    """
+    count, height, width = sources.shape[:3]
+    xs = np.floor(np.asarray(xs)).astype(np.intp).reshape(count, 1, 1)
+    ys = np.floor(np.asarray(ys)).astype(np.intp).reshape(count, 1, 1)
+
+    rows = ys + np.arange(height).reshape(1, height, 1)
+    columns = xs + np.arange(width).reshape(1, 1, width)
+    inside = ((rows >= 0) & (rows < destinations.shape[1]) &
+              (columns >= 0) & (columns < destinations.shape[2]))
+
+    # Only the pixels inside the destinations are gathered and scattered,
+    # so every destination pixel is written once.
+    samples = np.broadcast_to(np.arange(count).reshape(count, 1, 1),
+                              inside.shape)[inside]
+    rows = np.broadcast_to(rows, inside.shape)[inside]
+    columns = np.broadcast_to(columns, inside.shape)[inside]
+
+    region = destinations[samples, rows, columns]
+    _blend(region, sources[inside])
+    destinations[samples, rows, columns] = region
+
+
+def _count_cells(size, origin, cell_size, step):
+    """Return the number of the cells which fit into the size."""
+    if origin + cell_size > size:
+        return 0
+    return (size - origin - cell_size) // step + 1
+
+
+def _get_runs(mask):
+    """Return the (start, stop) tuples of the runs of the True values."""
+    edges = np.flatnonzero(np.diff(np.concatenate(
+        ([0], mask.astype(np.int8), [0]))))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def _blend(destination, source):
+    """Composite the source over the destination of the same size."""
+    has_alpha = source.shape[-1] in (2, 4)
+    color = source.shape[-1] - has_alpha
+    integer = np.issubdtype(destination.dtype, np.integer)
+    limit = np.iinfo(destination.dtype).max if integer else 1
+
+    if not has_alpha:
+        destination[..., :color] = source
+        if destination.shape[-1] > color:
+            destination[..., color:] = limit
+        return
+
+    if integer:
+        # uint8 * 255 + uint8 * 255 still fits into uint16.
+        work_type = np.uint16 if destination.dtype.itemsize == 1 else np.int64
+        alpha = source[..., color:].astype(work_type)
+        inverse = limit - alpha
+        half = limit // 2
+        destination[..., :color] = (source[..., :color] * alpha +
+                                    destination[..., :color] * inverse +
+                                    half) // limit
+        if destination.shape[-1] > color:
+            destination[..., color:] = alpha + (
+                destination[..., color:] * inverse + half) // limit
+    else:
+        alpha = source[..., color:]
+        inverse = 1 - alpha
+        destination[..., :color] = (source[..., :color] * alpha +
+                                    destination[..., :color] * inverse)
+        if destination.shape[-1] > color:
+            destination[..., color:] = (alpha +
+                                        destination[..., color:] * inverse)
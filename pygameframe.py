@@ -1,7 +1,12 @@
 # -*- coding: utf-8 -*-
+from collections import OrderedDict
+import itertools
+import math
+from concurrent.futures import ThreadPoolExecutor
+
 import pygame
 
-from anim10 import Frame
+from anim10 import Atlas, Frame, Grid
 
 
 class PyGameFrame(Frame):
@@ -12,4 +17,646 @@ class PyGameFrame(Frame):
         rect = (self.x, self.y, self.width, self.height)
         self.quad.blit(image, (0, 0), rect)
 
-        canvas.blit(self.quad, (x, y))
+        canvas.blit(self.quad, (x + self.offset_x, y + self.offset_y))
+
+
+# The generations are never reused, so the variants of the deleted frames
+# are never returned for the new frames with the same id.
+_generations = itertools.count()
+
+
+class TransformCache:
+    """The LRU cache of the transformed frame variants.
+
+    Each variant is computed once and then reused until it is evicted.
+    The variants are kept in the order of use and the least recently used
+    ones are dropped when the total size exceeds the budget.
+
+    Attributes:
+        budget (int): The maximum size of all the variants in bytes.
+        angle_step (number): The rotation angle is rounded to this step
+            in degrees, so close angles share one variant.
+        size (int): The current size of all the variants in bytes.
+        hits (int): The number of the requests served from the cache.
+        misses (int): The number of the variants computed.
+
+    """
+    def __init__(self, budget=32 * 1024 * 1024, angle_step=1):
+        """Initialize the cache object.
+
+        Args:
+            budget (int, optional): The maximum size of all the variants
+                in bytes. Defaults to 32 MiB.
+            angle_step (number, optional): The rotation angle step in
+                degrees. Defaults to 1.
+
+        """
+        self.budget = budget
+        self.angle_step = angle_step
+
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._variants = OrderedDict()
+
+    def __len__(self):
+        return len(self._variants)
+
+    def get_angle_bucket(self, angle):
+        """Return the rotation angle rounded to the angle step."""
+        buckets = round(360 / self.angle_step)
+        return round(angle / self.angle_step) % buckets * self.angle_step
+
+    def get(self, key, build):
+        """Return the cached variant or build and cache the new one.
+
+        Args:
+            key: Any hashable key of the variant. The key should not refer
+                to the surfaces, because the keys are kept until
+                the variants are evicted and only the variants are counted
+                in the budget.
+            build (function): Creates the variant surface if it is
+                not in the cache.
+
+        Returns:
+            The variant surface.
+
+        """
+        entry = self._variants.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._variants.move_to_end(key)
+            return entry[0]
+
+        self.misses += 1
+        variant = build()
+
+        size = variant.get_pitch() * variant.get_height()
+        if size <= self.budget:
+            self._variants[key] = variant, size
+            self.size += size
+            while self.size > self.budget:
+                _, (_, evicted_size) = self._variants.popitem(last=False)
+                self.size -= evicted_size
+        return variant
+
+    def discard(self, frames):
+        """Drop the variants of the given frames.
+
+        Args:
+            frames (list): The frames whose variants are dropped.
+
+        """
+        frames = set(map(id, frames))
+        for key in [key for key in self._variants
+                    if isinstance(key, tuple) and key[0] in frames]:
+            _, size = self._variants.pop(key)
+            self.size -= size
+
+    def clear(self):
+        """Drop all the variants and reset the counters."""
+        self._variants.clear()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+
+class PyGameSubsurfaceFrame(Frame):
+    """The frame which draws the image region without an intermediate copy.
+
+    The frame binds to the image on the first draw and keeps
+    the subsurface view of its viewport in the quad attribute. If the frame
+    does not fit into the image, the frame blits the image region directly
+    with the area argument. When another image is passed, the frame rebinds.
+
+    The flipped, scaled and rotated variants of the frame are computed once
+    and kept in the transform_cache. The cached variants are not updated
+    when the image pixels are changed in place.
+
+    If the frame is packed by build_atlas, it draws from the atlas page
+    and ignores the image argument.
+
+    Attributes:
+        image (pygame.Surface): The image the frame is bound to.
+        generation (int): The unique number of the binding, which tells
+            the cached variants of the previous images apart.
+        page (pygame.Surface): The atlas page of the frame or None.
+        transform_cache (TransformCache): The cache of the transformed
+            variants. It is shared by all the frames of this class.
+
+    """
+    transformable = True
+    transform_cache = TransformCache()
+
+    def create_frame(self, width, height):
+        self.image = None
+        self.page = None
+        return None
+
+    def draw(self, canvas, image, x, y,
+             flip_h=False, flip_v=False, scale=1, angle=0):
+        """Draw the frame.
+
+        Args:
+            canvas (pygame.Surface): The surface to draw on.
+            image (pygame.Surface): The image where all the frames are.
+            x (number): The left coordinate of the frame on the canvas.
+            y (number): The top coordinate of the frame on the canvas.
+            flip_h (bool, optional): Flip the frame horizontally.
+            flip_v (bool, optional): Flip the frame vertically.
+            scale (number, optional): The scale factor. Defaults to 1.
+            angle (number, optional): The counterclockwise rotation angle
+                in degrees. The rotated frame keeps its center.
+
+        """
+        source, area, dx, dy = self.get_blit(image, flip_h, flip_v,
+                                             scale, angle)
+        canvas.blit(source, (x + dx, y + dy), area)
+
+    def get_blit(self, image, flip_h=False, flip_v=False, scale=1, angle=0):
+        if self.page is not None:
+            image = self.page
+        if image is not self.image:
+            self.bind(image)
+
+        dx, dy = self.get_offset(flip_h, flip_v)
+        if flip_h or flip_v or scale != 1 or angle:
+            angle = self.transform_cache.get_angle_bucket(angle)
+            key = id(self), self.generation, flip_h, flip_v, scale, angle
+            variant = self.transform_cache.get(
+                key, lambda: self._transform(flip_h, flip_v, scale, angle))
+            if not angle:
+                return variant, None, dx * scale, dy * scale
+
+            # The center of the trimmed frame is rotated around the center
+            # of the original frame.
+            center_x = self.full_width * scale / 2
+            center_y = self.full_height * scale / 2
+            x = (dx + self.width / 2) * scale - center_x
+            y = (dy + self.height / 2) * scale - center_y
+            cos, sin = math.cos(math.radians(angle)), \
+                math.sin(math.radians(angle))
+            return (variant, None,
+                    center_x + x * cos + y * sin - variant.get_width() / 2,
+                    center_y - x * sin + y * cos - variant.get_height() / 2)
+        if self.quad is not None:
+            return self.quad, None, dx, dy
+        return image, self.get_viewport(), dx, dy
+
+    def bind(self, image):
+        """Create the subsurface view of the frame viewport.
+
+        Args:
+            image (pygame.Surface): The image where all the frames are.
+
+        """
+        self.image = image
+        self.generation = next(_generations)
+        try:
+            self.quad = image.subsurface(self.get_viewport())
+        except ValueError:
+            self.quad = None
+
+    def _transform(self, flip_h, flip_v, scale, angle):
+        """Compute the transformed variant of the frame."""
+        source = self.quad
+        if source is None:
+            source = pygame.Surface((self.width, self.height),
+                                    pygame.SRCALPHA, self.image)
+            source.blit(self.image, (0, 0), self.get_viewport())
+
+        if flip_h or flip_v:
+            source = pygame.transform.flip(source, flip_h, flip_v)
+        if scale != 1:
+            size = round(self.width * scale), round(self.height * scale)
+            source = pygame.transform.scale(source, size)
+        if angle:
+            source = pygame.transform.rotate(source, angle)
+        return source
+
+
+def convert_alpha(image):
+    """Return the image with the per-pixel alpha and without the colorkey.
+    The colorkey pixels become transparent. The image which has the alpha
+    already is returned as is.
+
+    Unlike pygame.Surface.convert_alpha, it works without the video mode
+    too, so the sheets can be processed offline.
+
+    Args:
+        image (pygame.Surface): The image to convert.
+
+    Returns:
+        The image with the per-pixel alpha.
+
+    """
+    if image.get_flags() & pygame.SRCALPHA and image.get_colorkey() is None:
+        return image
+    if pygame.display.get_init() and pygame.display.get_surface() is not None:
+        return image.convert_alpha()
+
+    result = pygame.Surface(image.get_size(), pygame.SRCALPHA, 32)
+    result.blit(image, (0, 0))
+    return result
+
+
+def copy_pixels(destination, source, position, area=None):
+    """Copy the source pixels with their alpha as is, without the alpha
+    blending. The source colorkey is honored.
+
+    Args:
+        destination (pygame.Surface): The transparent black surface with
+            the per-pixel alpha, for example, a new SRCALPHA surface.
+        source (pygame.Surface): The image to copy from. Convert it with
+            the convert_alpha function before, when you copy several
+            regions of the colorkeyed image.
+        position (tuple): The (x, y) position in the destination.
+        area (tuple, optional): The source region. Defaults to the whole
+            source.
+
+    """
+    # The destination is transparent black, so the max blend copies
+    # the pixels as is.
+    destination.blit(convert_alpha(source), position, area,
+                     special_flags=pygame.BLEND_RGBA_MAX)
+
+
+def build_atlas(sources, page_width=2048, page_height=2048, padding=1):
+    """Pack the frames of several grids into the atlas pages.
+    The frames are remapped in place, so the animations built from the grids
+    keep working and draw from the pages.
+
+    Only the created grid frames are packed. Call Grid.prebuild before,
+    if you need all of them.
+
+    Args:
+        sources (list): The (grid, image) tuples. The grids must use
+            the PyGameSubsurfaceFrame frames.
+        page_width (int, optional): The maximal page width. Defaults to 2048.
+        page_height (int, optional): The maximal page height.
+            Defaults to 2048.
+        padding (int, optional): The gap between the frames in the page.
+            Defaults to 1.
+
+    Returns:
+        A tuple of the page surfaces list and the Atlas object, which
+        keeps the packing statistics.
+
+    Examples:
+        pages, atlas = build_atlas([(g32, image), (witch_grid, witch_image)])
+        print('{0} pages, {1:.1f}% wasted'.format(len(pages), atlas.waste))
+
+    """
+    images, frames, converted = {}, [], {}
+    for grid, image in sources:
+        if not issubclass(grid.FrameType, PyGameSubsurfaceFrame):
+            raise TypeError('build_atlas requires PyGameSubsurfaceFrame grids')
+        if id(image) not in converted:
+            converted[id(image)] = convert_alpha(image)
+        for frame in grid.cells:
+            if frame is not None and id(frame) not in images:
+                images[id(frame)] = converted[id(image)]
+                frames.append(frame)
+
+    atlas = Atlas(frames, page_width, page_height, padding)
+    pages = [pygame.Surface(size, pygame.SRCALPHA, 32) for size in atlas.pages]
+
+    for frame, page, x, y in atlas.placements:
+        copy_pixels(pages[page], images[id(frame)], (x, y),
+                    frame.get_viewport())
+
+    atlas.remap()
+    for frame in frames:
+        frame.page = pages[frame.atlas_page]
+        frame.image = None
+
+    return pages, atlas
+
+
+def trim_grid(grid, image, threshold=0):
+    """Trim the transparent borders of all the grid frames, so only
+    the opaque regions are drawn (and packed by build_atlas). The frames
+    are drawn at the same positions. Requires numpy.
+
+    Args:
+        grid (Grid): The grid to trim. The missing frames are created.
+        image (pygame.Surface): The image where all the frames are.
+        threshold (int, optional): The pixels with the alpha up to
+            the threshold are transparent. The colorkey pixels are
+            transparent too. Defaults to 0.
+
+    Returns:
+        The grid.
+
+    """
+    import numpyframe
+    return numpyframe.trim_grid(grid, _get_alpha(image), threshold)
+
+
+def detect_frames(FrameType, image, threshold=0):
+    """Find the frames of the irregular sheet by its transparent gaps.
+    Requires numpy.
+
+    Args:
+        FrameType (class): Derived class from the Frame
+            with overloaded methods.
+        image (pygame.Surface): The sheet image.
+        threshold (int, optional): The pixels with the alpha up to
+            the threshold are transparent. The colorkey pixels are
+            transparent too. Defaults to 0.
+
+    Returns:
+        The list of the tight frames from the left to the right and from
+        the top to the bottom.
+
+    """
+    import numpyframe
+    return numpyframe.detect_frames(FrameType, _get_alpha(image),
+                                    threshold)
+
+
+def _get_alpha(image):
+    """Return the (height, width) alpha array of the image. The colorkey
+    pixels are transparent, because array_alpha ignores the colorkey."""
+    import numpy as np
+    alpha = pygame.surfarray.array_alpha(image)
+    if image.get_colorkey() is not None:
+        alpha = np.minimum(alpha, pygame.surfarray.array_colorkey(image))
+    return alpha.T
+
+
+class DirtyRects:
+    """Redraws and presents only the changed regions of the canvas.
+
+    Every frame the visible animations are added with their positions.
+    The region of the sprite becomes dirty when the sprite is moved, its
+    frame is changed, or it appears or disappears. The overlapping dirty
+    regions are merged, erased with the background, and the sprites which
+    touch them are redrawn clipped to them. The other pixels are not
+    touched, so the merged regions can be passed to pygame.display.update.
+
+    Attributes:
+        background: The surface or the color to erase the dirty regions
+            with. The surface must have the size of the canvas.
+
+    Examples:
+        dirty = DirtyRects((0, 0, 0))
+
+        plane.update(dt)
+        dirty.add(plane, image, 100, 400)
+        pygame.display.update(dirty.draw(screen))
+
+    """
+    def __init__(self, background=(0, 0, 0)):
+        """Initialize the tracker object.
+
+        Args:
+            background (optional): The surface or the color to erase
+                the dirty regions with. Defaults to black.
+
+        """
+        self.background = background
+        self._sprites = []
+        self._last = {}
+        self._dirty = [None]
+
+    def __len__(self):
+        return len(self._sprites)
+
+    def add(self, animation, image, x, y, changed=False, key=None, **kwargs):
+        """Add the sprite to the current frame.
+
+        Args:
+            animation (Animation): The animation to draw.
+            image (pygame.Surface): The image where all the frames are.
+            x (number): The left coordinate of the sprite on the canvas.
+            y (number): The top coordinate of the sprite on the canvas.
+            changed (bool, optional): Redraw the sprite even if neither
+                its frame nor its position has changed, for example,
+                when the image pixels are changed.
+            key (optional): The hashable sprite identity. Defaults to
+                the animation, pass it to draw one animation several times.
+            You can specify any other arguments, they will be passed to
+            the Animation.draw() method.
+
+        """
+        frame = animation.get_frame_info()
+        blit_kwargs = kwargs
+        if frame.transformable:
+            blit_kwargs = dict(kwargs, flip_h=animation.flipped_h,
+                               flip_v=animation.flipped_v)
+        source, area, dx, dy = frame.get_blit(image, **blit_kwargs)
+        if area is None:
+            width, height = source.get_size()
+        else:
+            width, height = area[2], area[3]
+
+        rect = _get_rect(x + dx, y + dy, width, height)
+        state = rect, source, tuple(area) if area is not None else None
+        self._sprites.append((animation if key is None else key, state,
+                              changed, (animation, image, x, y, kwargs)))
+
+    def invalidate(self, rect=None):
+        """Mark the region as dirty.
+
+        Args:
+            rect (optional): The region to redraw. Defaults to
+                the whole canvas.
+
+        """
+        self._dirty.append(None if rect is None else pygame.Rect(rect))
+
+    def draw(self, canvas):
+        """Redraw the dirty regions of the canvas and start the next frame.
+
+        Args:
+            canvas (pygame.Surface): The surface to draw on. It must keep
+                the pixels drawn on the previous frames.
+
+        Returns:
+            The list of the merged dirty pygame.Rect objects.
+
+        """
+        bounds = canvas.get_rect()
+        dirty, last = self._dirty, self._last
+        self._last = {}
+        for key, state, changed, _ in self._sprites:
+            previous = last.pop(key, None)
+            if previous is None:
+                dirty.append(state[0])
+            elif changed or previous != state:
+                dirty.append(previous[0])
+                dirty.append(state[0])
+            self._last[key] = state
+        # The sprites which have not been added have disappeared.
+        dirty.extend(state[0] for state in last.values())
+
+        if None in dirty:
+            rects = [bounds]
+        else:
+            rects = [rect for rect in _merge_rects(
+                rect.clip(bounds) for rect in dirty) if rect]
+
+        clip = canvas.get_clip()
+        for rect in rects:
+            canvas.set_clip(rect)
+            if isinstance(self.background, pygame.Surface):
+                canvas.blit(self.background, rect, rect)
+            else:
+                canvas.fill(self.background, rect)
+            for _, state, _, (animation, image, x, y, kwargs) in self._sprites:
+                if rect.colliderect(state[0]):
+                    animation.draw(canvas, image, x, y, **kwargs)
+        canvas.set_clip(clip)
+
+        self._sprites = []
+        self._dirty = []
+        return rects
+
+
+def _get_rect(x, y, width, height):
+    """Return the pixel rectangle which covers the fractional one."""
+    left, top = math.floor(x), math.floor(y)
+    return pygame.Rect(left, top, math.ceil(x + width) - left,
+                       math.ceil(y + height) - top)
+
+
+def _merge_rects(rects):
+    """Merge the overlapping rectangles, so no two of them overlap."""
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+class SheetHandle:
+    """The sprite sheet which is being loaded by the SheetLoader.
+
+    The grid is available at once, so the animations can be built before
+    the image is loaded. Until then the image attribute returns
+    the placeholder.
+
+    Attributes:
+        grid (Grid): The grid of the sheet.
+        future (concurrent.futures.Future): The future of the loaded image.
+        placeholder (pygame.Surface): The image to draw while the sheet
+            is not loaded.
+
+    """
+    def __init__(self, grid, future, placeholder):
+        self.grid = grid
+        self.future = future
+        self.placeholder = placeholder
+
+    @property
+    def ready(self):
+        """Whether the image is loaded."""
+        return self.future.done()
+
+    @property
+    def image(self):
+        """The loaded image or the placeholder.
+
+        Raises:
+            The exception of the loading, if it has failed.
+
+        """
+        if self.future.done():
+            return self.future.result()
+        return self.placeholder
+
+    def __call__(self, *args, **kwargs):
+        """An alias for the grid get_frames function."""
+        return self.grid.get_frames(*args, **kwargs)
+
+
+class SheetLoader:
+    """Loads the sprite sheets and slices their frames on a thread pool.
+
+    Examples:
+        loader = SheetLoader()
+        witch = loader.load('media/witch.png', 32, 32, 384, 256)
+        walk = Animation(witch('1-3', 1, 2, 1), 0.15)
+
+        walk.draw(screen, witch.image, x, y) # Draws nothing until loaded.
+
+    """
+    def __init__(self, max_workers=None):
+        """Initialize the loader object.
+
+        Args:
+            max_workers (int, optional): The number of the threads.
+                Defaults to the ThreadPoolExecutor default.
+
+        """
+        self._executor = ThreadPoolExecutor(max_workers)
+        self._placeholder = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def load(self, path, frame_width, frame_height, image_width, image_height,
+             left=0, top=0, border=0, FrameType=None, placeholder=None,
+             prebuild=True):
+        """Start loading the sprite sheet.
+
+        Args:
+            path (str): The image file path.
+            frame_width, frame_height, image_width, image_height, left, top,
+            border: The same as the Grid arguments.
+            FrameType (class, optional): The frame class.
+                Defaults to PyGameSubsurfaceFrame.
+            placeholder (pygame.Surface, optional): The image to draw while
+                the sheet is not loaded. Defaults to an empty surface, so
+                nothing is drawn.
+            prebuild (bool, optional): Create all the grid frames at once
+                and bind them on the thread pool. Defaults to True.
+
+        Returns:
+            The SheetHandle object.
+
+        """
+        grid = Grid(FrameType or PyGameSubsurfaceFrame,
+                    frame_width, frame_height, image_width, image_height,
+                    left, top, border)
+        if placeholder is None:
+            if self._placeholder is None:
+                self._placeholder = pygame.Surface((0, 0), pygame.SRCALPHA, 32)
+            placeholder = self._placeholder
+
+        # The frames are created here, so the thread pool never changes
+        # the grid cells while the get_frames calls fill them.
+        frames = tuple(grid.prebuild().cells) if prebuild else ()
+        future = self._executor.submit(_load_sheet, path, frames)
+        return SheetHandle(grid, future, placeholder)
+
+    def shutdown(self, wait=True):
+        """Stop the threads.
+
+        Args:
+            wait (bool, optional): Wait for the started loadings.
+                Defaults to True.
+
+        """
+        self._executor.shutdown(wait)
+
+
+def _load_sheet(path, frames):
+    """Load the image and bind the frames to it. Runs on the thread pool."""
+    image = pygame.image.load(path)
+    if pygame.display.get_surface() is not None:
+        image = image.convert_alpha()
+
+    for frame in frames:
+        if hasattr(frame, 'bind'):
+            frame.bind(image)
+    return image
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""Multi-process simulation of very large animation populations.
+
+The animation state (timer, position, status, loops) lives in shared memory
+NumPy arrays. Each worker process advances its own slice with the same
+rules as Animation.update. The state is double buffered: the workers read
+the front buffer and write the back one, so the main process can read
+the front buffer without copying while the update is running.
+
+Requires numpy.
+
+Examples:
+    templates = [AnimationTemplate(range(8), 0.1),
+                 AnimationTemplate(range(3), 0.15)]
+    with ShardedAnimations(templates, template_ids, workers=4) as state:
+        state.update(1 / 60)
+        positions = state.positions # The zero-copy view.
+
+"""
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+from anim10 import Status
+
+_FIELDS = (
+    # name, dtype, buffered
+    ('timers', np.float64, True),
+    ('positions', np.int32, True),
+    ('statuses', np.int8, True),
+    ('loops', np.int32, True),
+    ('template_ids', np.int32, False),
+)
+
+
+class ShardedAnimations:
+    """The animation states advanced by the worker processes.
+
+    Attributes:
+        count (int): The number of the animations.
+        workers (int): The number of the worker processes.
+
+    """
+    def __init__(self, templates, template_ids, workers=None):
+        """Create the shared state and start the workers.
+
+        Args:
+            templates (list): The AnimationTemplate objects (or any objects
+                with the intervals and total_duration attributes).
+            template_ids (list): The template index of each animation.
+            workers (int, optional): The number of the worker processes.
+                Defaults to the number of the CPUs.
+
+        """
+        template_ids = np.asarray(template_ids, dtype=np.int32)
+        self.count = len(template_ids)
+        self.workers = max(1, min(workers or os.cpu_count() or 1,
+                                  self.count or 1))
+
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=max(_get_size(self.count), 1))
+        self._arrays = _map_arrays(self._shm.buf, self.count)
+        self._arrays['template_ids'][:] = template_ids
+        self._arrays['statuses'][:] = Status.playing
+        self._front = 0
+
+        tables = [(tuple(template.intervals), template.total_duration)
+                  for template in templates]
+        bounds = np.linspace(0, self.count, self.workers + 1).astype(int)
+
+        context = multiprocessing.get_context()
+        self._connections, self._processes = [], []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_work, daemon=True,
+                args=(self._shm.name, self.count, start, stop, tables, child))
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+        self._pending = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def timers(self):
+        """The read-only view of the current timers."""
+        return self._get_view('timers')
+
+    @property
+    def positions(self):
+        """The read-only view of the current frame positions."""
+        return self._get_view('positions')
+
+    @property
+    def statuses(self):
+        """The current statuses. Change them between the updates only."""
+        return self._arrays['statuses'][self._front]
+
+    @property
+    def loops(self):
+        """The read-only view of the number of the loops of each animation
+        at the last update."""
+        return self._get_view('loops')
+
+    def start_update(self, dt):
+        """Start advancing the animations. The current state can be read
+        until the wait method is called.
+
+        Args:
+            dt (float): Delta-time between two frames.
+
+        """
+        assert not self._pending, 'The previous update is not finished'
+        for connection in self._connections:
+            connection.send((self._front, dt))
+        self._pending = True
+
+    def wait(self):
+        """Wait for the started update and make its state current."""
+        if not self._pending:
+            return
+        for connection in self._connections:
+            connection.recv()
+        self._front = 1 - self._front
+        self._pending = False
+
+    def update(self, dt):
+        """Advance the animations and wait for the result.
+
+        Args:
+            dt (float): Delta-time between two frames.
+
+        """
+        self.start_update(dt)
+        self.wait()
+
+    def close(self):
+        """Stop the workers and release the shared memory."""
+        if self._shm is None:
+            return
+        self.wait()
+        for connection in self._connections:
+            connection.send(None)
+            connection.close()
+        for process in self._processes:
+            process.join()
+
+        self._arrays = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def _get_view(self, name):
+        view = self._arrays[name][self._front].view()
+        view.flags.writeable = False
+        return view
+
+
+def _get_size(count):
+    """Return the shared memory size for the given number of animations."""
+    size = 0
+    for _, dtype, buffered in _FIELDS:
+        size = _align(size) + np.dtype(dtype).itemsize * count * (
+            2 if buffered else 1)
+    return size
+
+
+def _map_arrays(buffer, count):
+    """Create the arrays over the shared memory buffer."""
+    arrays, offset = {}, 0
+    for name, dtype, buffered in _FIELDS:
+        offset = _align(offset)
+        shape = (2, count) if buffered else (count,)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buffer,
+                                  offset=offset)
+        offset += arrays[name].nbytes
+    return arrays
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+
+def _work(name, count, start, stop, tables, connection):
+    """Advance the animations from start to stop. Runs in the worker."""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        _serve(shm.buf, count, start, stop, tables, connection)
+    finally:
+        shm.close()
+
+
+def _serve(buffer, count, start, stop, tables, connection):
+    """Process the update messages until the stop message."""
+    arrays = _map_arrays(buffer, count)
+    template_ids = arrays['template_ids'][start:stop]
+    totals = np.array([total for _, total in tables])[template_ids]
+    groups = [(np.asarray(intervals, dtype=np.float64),
+               np.flatnonzero(template_ids == i))
+              for i, (intervals, _) in enumerate(tables)]
+    groups = [group for group in groups if len(group[1])]
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            return
+        front, dt = message
+        back = 1 - front
+
+        timers = arrays['timers'][back, start:stop]
+        timers[:] = arrays['timers'][front, start:stop]
+        positions = arrays['positions'][back, start:stop]
+        positions[:] = arrays['positions'][front, start:stop]
+        statuses = arrays['statuses'][back, start:stop]
+        statuses[:] = arrays['statuses'][front, start:stop]
+
+        # The same steps as in Animation.update.
+        playing = statuses == Status.playing
+        np.add(timers, dt, out=timers, where=playing)
+        loops = np.floor(timers / totals)
+        loops[~playing] = 0
+        timers -= totals * loops
+        arrays['loops'][back, start:stop] = loops
+
+        for intervals, indices in groups:
+            found = np.searchsorted(intervals, timers[indices],
+                                    side='left') - 1
+            found[found < 0] = len(intervals) - 1
+            positions[indices] = np.where(playing[indices],
+                                          found, positions[indices])
+
+        connection.send(True)
@@ -2,12 +2,11 @@
 # -*- coding: utf-8 -*-
 from enum import Enum
 import sys
-import time
 import pygame
 
-from anim10 import Animation, Grid, Frame
-from helpers import get_delta_time, process_events
-from pygameframe import PyGameFrame
+from anim10 import Animation, AnimationGroup, Grid, Frame
+from helpers import Clock, process_events
+from pygameframe import PyGameSubsurfaceFrame
 
 SCREEN_SIZE = (800, 600)
 
@@ -37,21 +36,24 @@ def main(argv):
 
     image = pygame.image.load('media/witch.png')
 
-    grid = Grid(PyGameFrame, 32, 32, 384, 256)
+    grid = Grid(PyGameSubsurfaceFrame, 32, 32, 384, 256)
 
-    move = {
+    last_direction = MoveDirection.down
+
+    # The directions share one timer, so turning keeps the step phase.
+    move = AnimationGroup({
         MoveDirection.down: Animation(grid('1-3', 1, 2, 1), 0.15),
         MoveDirection.up: Animation(grid('1-3', 4, 2, 4), 0.15),
         MoveDirection.left: Animation(grid('1-3', 2, 2, 2), 0.15),
         MoveDirection.right: Animation(grid('1-3', 3, 2, 3), 0.15),
-    }
+    }, active=last_direction)
 
-    last_direction = MoveDirection.down
+    clock = Clock(fps=60)
 
     terminated = False
     while not terminated:
         terminated = process_events()
-        dt = get_delta_time()
+        dt = clock.tick()
 
         keyboard_state = pygame.key.get_pressed()
 
@@ -74,7 +76,8 @@ def main(argv):
             moving = True
 
         if moving:
-            move[last_direction].update(dt)
+            move.switch(last_direction)
+            move.update(dt)
 
             if last_direction == MoveDirection.down:
                 player_y += player_speed * dt
@@ -88,7 +91,7 @@ def main(argv):
         screen.fill((0, 0, 0, 255))
         canvas.fill((0, 0, 0, 255))
 
-        move[last_direction].draw(canvas, image, player_x, player_y)
+        move.draw(canvas, image, player_x, player_y)
 
         display_text(canvas, 'Press up/down/left/right arrows', 10, 10)
         display_text(canvas, 'to control the witch.', 10, 30)
@@ -97,7 +100,6 @@ def main(argv):
         screen.blit(output, (0, 0))
 
         pygame.display.update()
-        time.sleep(0.001)
 
 if __name__ == '__main__':
     sys.exit(main(sys.argv))